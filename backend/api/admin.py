@@ -0,0 +1,46 @@
+import asyncio
+import hmac
+import threading
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from config import settings
+from core.profiling import sample_stacks, folded_text, slow_requests
+
+def require_admin(x_admin_token: str = Header(default="")):
+    """Admin endpoints are open unless ADMIN_TOKEN is set, then the X-Admin-Token header must match."""
+    if settings.ADMIN_TOKEN and not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+MAX_PROFILE_SECONDS = 60
+_profile_lock = threading.Lock()
+
+@router.get("/profile")
+async def profile(seconds: float = 10.0, interval_ms: float = 5.0, idle: bool = False, format: str = "folded"):
+    """
+    Sample the stacks of all threads of this worker for `seconds` and return them as folded stacks
+    (flamegraph.pl / speedscope input), or as JSON with format=json.
+    idle=true keeps threads that are only waiting for work.
+    """
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_PROFILE_SECONDS}]")
+    if interval_ms < 1:
+        raise HTTPException(status_code=400, detail="interval_ms must be at least 1")
+    if not _profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    try:
+        # Own thread rather than the bounded pools: profiling is most needed when those are saturated
+        result = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000, idle)
+    finally:
+        _profile_lock.release()
+
+    if format == "json":
+        return result
+    return PlainTextResponse(folded_text(result["folded"]))
+
+@router.get("/slow_requests")
+async def get_slow_requests(limit: int = 20):
+    """Most recent slow requests of this worker with their per-stage traces (see SLOW_REQUEST_MS)."""
+    return {"threshold_ms": settings.SLOW_REQUEST_MS, "requests": list(slow_requests)[-limit:][::-1]}
@@ -3,11 +3,18 @@ from pydantic import BaseModel
 import os
 from typing import List
 from config import settings
-from core.video_processing import extract_frames
+from core.video_processing import extract_frames, cached_frame_index, is_extraction_locked, ExtractionInProgress, FRAME_INDEX_COLUMNS
+from core.executors import io_executor, bulk_executor, cpu_executor, inference_executor, batch_executor, executor_stats, ExecutorBusy
+from core.profiling import trace_stage, detached
+from core.region_pipeline import RegionSource, LetterboxCanvas, region_budget
+from core.annotation_stats import get_annotation_stats, coverage_bins
+from core.masks import encode_rle, mask_to_polygons, apply_mask_to_crop, sidecar_path, write_sidecar, read_sidecar
 import cv2
-import numpy as np
 import json
 import time
+import hashlib
+import bisect
+import asyncio
 
 def cleanup_old_files(directory: str, max_age_seconds: int = 3600):
     """Delete files in directory older than max_age_seconds."""
@@ -24,6 +31,11 @@ def cleanup_old_files(directory: str, max_age_seconds: int = 3600):
             except Exception as e:
                 print(f"Error deleting old file {file_path}: {e}")
 
+def video_version(video_path: str) -> str:
+    """Short version key of a video file, changes when the file is replaced."""
+    st = os.stat(video_path)
+    return hashlib.sha1(f"{st.st_size}-{st.st_mtime_ns}".encode()).hexdigest()[:12]
+
 router = APIRouter()
 
 class VideoInfo(BaseModel):
@@ -31,8 +43,11 @@ class VideoInfo(BaseModel):
     path: str
 
 @router.get("/videos", response_model=List[VideoInfo])
-def list_videos():
+async def list_videos():
     """List all MP4 videos in the configured directory."""
+    return await io_executor.run(_list_videos)
+
+def _list_videos():
     video_dir = settings.VIDEO_DIR
     if not os.path.exists(video_dir):
         print(f"Warning: Video directory {video_dir} does not exist.")
@@ -49,68 +64,142 @@ def list_videos():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing videos: {str(e)}")
 
-from core.ai_models import YOLOModel, YOLOSegModel, SAM2Model
-from ultralytics import YOLO
-
-# Initialize models globally
-yolo_model = None
-yolo_seg_model = None
-sam_model = None
-
-try:
-    print(f"Loading YOLO model from {settings.YOLO_MODEL_PATH}...")
-    yolo_model = YOLO(settings.YOLO_MODEL_PATH)
-    print("YOLO model loaded.")
-except Exception as e:
-    print(f"Failed to initialize YOLO model: {e}")
-
-try:
-    print(f"Loading YOLO Seg model from {settings.YOLO_SEG_MODEL_PATH}...")
-    yolo_seg_model = YOLOSegModel(settings.YOLO_SEG_MODEL_PATH)
-    print("YOLO Seg model loaded.")
-except Exception as e:
-    print(f"Failed to initialize YOLO Seg model: {e}")
-
-try:
-    print(f"Loading SAM model from {settings.SAM2_MODEL_PATH}...")
-    sam_model = SAM2Model(settings.SAM2_MODEL_PATH)
-    print("SAM model loaded.")
-except Exception as e:
-    print(f"Failed to initialize SAM model: {e}")
+from core.model_service import get_models
+
+# Models are loaded in this process, or served by model_server.py in multi-worker mode
+models = get_models()
 
 from api.state import progress_store
 
 @router.get("/progress/{video_name}")
-def get_progress(video_name: str):
+async def get_progress(video_name: str):
     """Get processing progress for a video."""
+    # Single indexed SQLite read, cheap enough to run on the event loop
     return {"progress": progress_store.get(video_name, 0)}
 
+@router.get("/executors")
+async def get_executor_stats():
+    """Get running/queued/rejected counts of the worker pools and usage of the /process memory budget."""
+    return {**executor_stats(), "region_memory": region_budget.stats()}
+
+@router.get("/devices")
+async def get_device_stats():
+    """Get per-device load, queue depth per priority, lease wait times and CPU fallbacks of the model calls."""
+    try:
+        return await io_executor.run(models.device_stats)
+    except ExecutorBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Model server unavailable: {str(e)}")
+
+# Background extractions started by this worker, by video name
+_extractions = {}
+
 @router.get("/frames")
-def get_frames_endpoint(video_path: str):
-    """Extract frames from video and return their URLs."""
+async def get_frames_endpoint(video_path: str, offset: int = 0, limit: int = 0, start: float = None, end: float = None):
+    """
+    Return the URLs and frame index of the extracted frames, starting extraction if needed.
+    Extraction runs in the background: while it is not finished the frames of the chunks done so far
+    are returned with complete=false, clients poll again to get the rest.
+    offset / limit paginate (limit=0: all), start / end (seconds) restrict to a time range.
+    """
     if not os.path.exists(video_path):
          raise HTTPException(status_code=404, detail=f"Video not found: {video_path}")
     
     video_name = os.path.splitext(os.path.basename(video_path))[0]
     # Use the configured cache directory
     output_dir = os.path.join(settings.FRAME_CACHE_DIR, video_name)
-    
+
+    # Cached videos are answered from the frame index without touching the extraction pool
+    index = await io_executor.run(cached_frame_index, output_dir)
+    if index is None or not index.get("complete", True):
+        task = await _start_extraction(video_path, output_dir, video_name)
+        # New video: give the first chunk a moment so the client gets frames right away
+        deadline = time.monotonic() + settings.EXTRACTION_FIRST_CHUNK_WAIT
+        while (index is None or not (index["frames"] or index.get("complete", True))) and time.monotonic() < deadline:
+            if task is not None and task.done() and task.exception() is not None:
+                error = task.exception()
+                if isinstance(error, (HTTPException, ExecutorBusy)):
+                    raise error
+                raise HTTPException(status_code=500, detail=str(error))
+            await asyncio.sleep(0.5)
+            index = await io_executor.run(cached_frame_index, output_dir)
+
+    # Page slicing and the video's version (a stat) stay off the event loop
+    return await io_executor.run(_frames_page, video_path, video_name, index, offset, limit, start, end)
+
+async def _start_extraction(video_path: str, output_dir: str, video_name: str):
+    """
+    Run extraction of a video on the CPU pool unless it is already running, here or in another
+    worker / preprocess_videos.py (fresh lock file). Returns the task, None if someone else extracts.
+    """
+    task = _extractions.get(video_name)
+    if task is None or task.done():
+        if await io_executor.run(is_extraction_locked, output_dir):
+            # Its checkpoints are served all the same, no need to spend a CPU slot on finding out
+            return None
+        # A failed extraction is retried by the next request
+        # Not part of this request: it runs on after the response, outside the request's trace
+        task = detached(asyncio.create_task, cpu_executor.run(_extract_video_frames, video_path, output_dir, video_name))
+        task.add_done_callback(_log_extraction_error)
+        _extractions[video_name] = task
+    return task
+
+def _log_extraction_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background frame extraction failed: {task.exception()}")
+
+def _extract_video_frames(video_path: str, output_dir: str, video_name: str):
     try:
         # Enforce rate=1.0 as per requirement
-        # Pass the loaded model for filtering
+        # Pass the loaded models for fish gating if enabled
         # Pass video_name for progress tracking
-        frames = extract_frames(video_path, output_dir, rate=1.0, video_name=video_name)
-        
-        # Update web paths to point to /static/frames
-        web_paths = [f"/static/frames/{video_name}/{os.path.basename(f)}" for f in frames]
-        
-        # Sort frames by timestamp/index to ensure correct order for slider
-        web_paths.sort(key=lambda x: int(x.split('_')[-1].split('.')[0]))
-        
-        return {"frames": web_paths, "count": len(frames)}
+        gate_model = models if settings.EXTRACTION_FISH_GATE else None
+        extract_frames(video_path, output_dir, rate=1.0, model=gate_model, video_name=video_name,
+                       mode=settings.FRAME_SAMPLING_MODE, frame_budget=settings.FRAME_BUDGET)
+    except ExtractionInProgress as e:
+        # Another worker or preprocess_videos.py is on it, its checkpoints are served all the same
+        print(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _frames_page(video_path: str, video_name: str, index: dict, offset: int, limit: int, start: float, end: float) -> dict:
+    if index is None:
+        # Extraction started but its first checkpoint is not written yet
+        index = {"frames": [], "timestamps": [], "columns": FRAME_INDEX_COLUMNS, "complete": False}
+
+    # Rows are in frame order, so a time range is a slice found by bisection
+    lo, hi = 0, len(index["frames"])
+    if start is not None:
+        lo = bisect.bisect_left(index["timestamps"], start)
+    if end is not None:
+        hi = bisect.bisect_right(index["timestamps"], end)
+
+    lo = min(hi, lo + max(0, offset))
+    if limit > 0:
+        hi = min(hi, lo + limit)
+    rows = index["frames"][lo:hi]
+
+    # Update web paths to point to /static/frames
+    # Content-address the URLs by the source video so they can be cached as immutable
+    version = video_version(video_path)
+    file_col = index["columns"].index("file")
+    web_paths = [f"/static/frames/{video_name}/{row[file_col]}?v={version}" for row in rows]
+    
+    return {
+        "frames": web_paths,
+        "count": len(web_paths),
+        "offset": lo,  # position of the first returned frame in the whole video
+        "total": len(index["frames"]),
+        "fps": index.get("fps"),
+        "width": index.get("width"),
+        "height": index.get("height"),
+        "columns": index["columns"],
+        "index": rows,
+        # false while extraction is still running, more frames will follow
+        "complete": index.get("complete", True),
+    }
+
 class ProcessRequest(BaseModel):
     frame_url: str # /static/frames/...
     bbox: List[float] # [x, y, w, h] normalized (0-1)
@@ -120,9 +209,16 @@ class ProcessRequest(BaseModel):
     seg_model: str = "YOLO" # "YOLO" or "SAM"
 
 @router.post("/process")
-def process_region(request: ProcessRequest):
+async def process_region(request: ProcessRequest):
     """Run AI on the selected region."""
-    if yolo_model is None:
+    return await inference_executor.run(_process_region, request)
+
+def _process_region(request: ProcessRequest):
+    try:
+        model_status = models.status()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Model server unavailable: {str(e)}")
+    if not model_status["yolo"]:
         raise HTTPException(status_code=503, detail="AI model not initialized")
 
     # Cleanup old crops (older than 1 hour)
@@ -131,7 +227,8 @@ def process_region(request: ProcessRequest):
     # Resolve frame_url to local path
     # URL: /static/frames/VideoName/File.jpg -> Local: settings.FRAME_CACHE_DIR/VideoName/File.jpg
     if request.frame_url.startswith("/static/frames/"):
-        rel_path = request.frame_url.replace("/static/frames/", "")
+        # Drop the ?v= cache key
+        rel_path = request.frame_url.split("?", 1)[0].replace("/static/frames/", "")
         local_path = os.path.join(settings.FRAME_CACHE_DIR, rel_path)
     else:
         # Fallback or error
@@ -140,12 +237,14 @@ def process_region(request: ProcessRequest):
     if not os.path.exists(local_path):
         raise HTTPException(status_code=404, detail=f"Frame not found: {local_path}")
     
-    # Read image
-    image = cv2.imread(local_path)
-    if image is None:
-        raise HTTPException(status_code=500, detail="Failed to read image")
-        
-    img_h, img_w = image.shape[:2]
+    # Only the frame header is read here, pixels are decoded per need by the region pipeline
+    with RegionSource(local_path) as source:
+        if source.frame_size is None:
+            raise HTTPException(status_code=500, detail="Failed to read image")
+        return _process_frame_region(request, source, local_path, model_status)
+
+def _process_frame_region(request: ProcessRequest, source: RegionSource, local_path: str, model_status: dict):
+    img_w, img_h = source.frame_size
     nx, ny, nw, nh = request.bbox
     
     # Convert normalized to pixel coords
@@ -163,13 +262,21 @@ def process_region(request: ProcessRequest):
     if w <= 0 or h <= 0:
         raise HTTPException(status_code=400, detail="Invalid bbox dimensions")
 
-    # Crop
-    crop = image[y:y+h, x:x+w]
+    # Crop (at reduced resolution when the region is much larger than the detector input)
+    source.set_region(x, y, w, h)
+    try:
+        crop, sx, sy = source.detection_image()
+    except ValueError:
+        raise HTTPException(status_code=500, detail="Failed to read image")
     
     # Detect fish in crop
     try:
         # Run inference
-        results = yolo_model.predict(crop, conf=request.conf_threshold, verbose=False)
+        with trace_stage("detect"):
+            detections = models.detect(crop, conf=request.conf_threshold)
+    except ExecutorBusy:
+        # No device free (see core/device_scheduler.py), 503 so the client retries
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
     
@@ -182,115 +289,122 @@ def process_region(request: ProcessRequest):
     os.makedirs(crops_dir, exist_ok=True)
     
     min_frame_dim = min(img_w, img_h)
+    # One canvas for all crops of this request
+    letterbox_canvas = LetterboxCanvas()
 
-    for result in results:
-        for i, box in enumerate(result.boxes):
-            conf = float(box.conf[0])
-            if conf < request.conf_threshold:
-                continue
+    for i, det in enumerate(detections):
+        conf = det["conf"]
+        if conf < request.conf_threshold:
+            continue
 
-            fx, fy, fx2, fy2 = box.xyxy[0].cpu().numpy()
-            fw = fx2 - fx
-            fh = fy2 - fy
-            
-            # Size Threshold Check
-            if max(fw, fh) < request.size_threshold * min_frame_dim:
-                continue
-
-            # Expand 1.1x
-            center_x = fx + fw / 2
-            center_y = fy + fh / 2
-            new_w = fw * 1.1
-            new_h = fh * 1.1
-            
-            fx_new = int(center_x - new_w / 2)
-            fy_new = int(center_y - new_h / 2)
-            fw_new = int(new_w)
-            fh_new = int(new_h)
-            
-            # Clip to CROP boundaries (since detection is on the crop)
-            fx_new = max(0, fx_new)
-            fy_new = max(0, fy_new)
-            fw_new = min(crop.shape[1] - fx_new, fw_new)
-            fh_new = min(crop.shape[0] - fy_new, fh_new)
+        # Back to full-resolution region coordinates
+        fx, fy, fx2, fy2 = det["xyxy"]
+        fx, fx2 = fx / sx, fx2 / sx
+        fy, fy2 = fy / sy, fy2 / sy
+        fw = fx2 - fx
+        fh = fy2 - fy
+        
+        # Size Threshold Check
+        if max(fw, fh) < request.size_threshold * min_frame_dim:
+            continue
+
+        # Expand 1.1x
+        center_x = fx + fw / 2
+        center_y = fy + fh / 2
+        new_w = fw * 1.1
+        new_h = fh * 1.1
+        
+        fx_new = int(center_x - new_w / 2)
+        fy_new = int(center_y - new_h / 2)
+        fw_new = int(new_w)
+        fh_new = int(new_h)
+        
+        # Clip to CROP boundaries (since detection is on the crop)
+        fx_new = max(0, fx_new)
+        fy_new = max(0, fy_new)
+        fw_new = min(w - fx_new, fw_new)
+        fh_new = min(h - fy_new, fh_new)
+        
+        if fw_new <= 0 or fh_new <= 0:
+            continue
             
-            if fw_new <= 0 or fh_new <= 0:
-                continue
+        # Small fish are cut from a full-resolution decode, large ones from the reduced one
+        fish_crop_img, csx, csy = source.crop(fx_new, fy_new, fw_new, fh_new)
+        if fish_crop_img.size == 0:
+            continue
+        
+        # Background Removal Logic
+        # The mask is returned as data (RLE + polygons in frame coordinates) and applied on the client /
+        # at export time, the crop JPEG keeps the original pixels
+        mask = None
+        if request.auto_segmentation:
+            if request.seg_model == "YOLO" and model_status["yolo_seg"]:
+                # YOLO Seg runs on the image and returns mask
+                # We can run it on the small fish crop for speed
+                with trace_stage("segment"):
+                    mask = models.segment(fish_crop_img, seg_model="YOLO")
+            elif request.seg_model == "SAM" and model_status["sam"]:
+                # Use the original detection BBox relative to the crop as the prompt
+                # fx, fy are in the original 'crop' coordinates
+                # fx_new, fy_new are the top-left of 'fish_crop_img' in 'crop' coordinates
+                # (scaled to the pixels of fish_crop_img, which may come from a reduced decode)
                 
-            fish_crop_img = crop[fy_new:fy_new+fh_new, fx_new:fx_new+fw_new]
-            
-            # Background Removal Logic
-            if request.auto_segmentation:
-                mask = None
-                if request.seg_model == "YOLO" and yolo_seg_model:
-                    # YOLO Seg runs on the image and returns mask
-                    # We can run it on the small fish crop for speed
-                    mask = yolo_seg_model.segment(fish_crop_img)
-                elif request.seg_model == "SAM" and sam_model:
-                    # Use the original detection BBox relative to the crop as the prompt
-                    # fx, fy are in the original 'crop' coordinates
-                    # fx_new, fy_new are the top-left of 'fish_crop_img' in 'crop' coordinates
-                    
-                    prompt_x = max(0, int(fx - fx_new))
-                    prompt_y = max(0, int(fy - fy_new))
-                    prompt_w = int(fw)
-                    prompt_h = int(fh)
-                    
-                    # Clip prompt to be within fish_crop_img dimensions
-                    h_f, w_f = fish_crop_img.shape[:2]
-                    prompt_w = min(w_f - prompt_x, prompt_w)
-                    prompt_h = min(h_f - prompt_y, prompt_h)
-                    
-                    if prompt_w > 0 and prompt_h > 0:
-                        mask = sam_model.segment(fish_crop_img, [prompt_x, prompt_y, prompt_w, prompt_h])
-                    else:
-                        print("Invalid SAM prompt dimensions, skipping segmentation")
-                        mask = None
+                prompt_x = max(0, int((fx - fx_new) * csx))
+                prompt_y = max(0, int((fy - fy_new) * csy))
+                prompt_w = int(fw * csx)
+                prompt_h = int(fh * csy)
                 
-                if mask is not None:
-                    # Apply mask: Black out background
-                    # mask is 0 or 255
-                    # Ensure mask is same size
-                    if mask.shape[:2] != fish_crop_img.shape[:2]:
-                         mask = cv2.resize(mask, (fish_crop_img.shape[1], fish_crop_img.shape[0]), interpolation=cv2.INTER_NEAREST)
-                    
-                    # Create 3-channel mask
-                    mask_3ch = cv2.merge([mask, mask, mask])
-                    
-                    # Apply
-                    fish_crop_img = cv2.bitwise_and(fish_crop_img, mask_3ch)
-
-            # Letterbox resize to 640x640
-            target_size = 640
-            h_crop, w_crop = fish_crop_img.shape[:2]
-            scale = target_size / max(h_crop, w_crop)
-            new_w_resize = int(w_crop * scale)
-            new_h_resize = int(h_crop * scale)
-            
-            resized = cv2.resize(fish_crop_img, (new_w_resize, new_h_resize))
-            
-            # Create black canvas
-            canvas = np.zeros((target_size, target_size, 3), dtype=np.uint8)
-            
-            # Paste resized image at center
-            x_offset = (target_size - new_w_resize) // 2
-            y_offset = (target_size - new_h_resize) // 2
-            canvas[y_offset:y_offset+new_h_resize, x_offset:x_offset+new_w_resize] = resized
+                # Clip prompt to be within fish_crop_img dimensions
+                h_f, w_f = fish_crop_img.shape[:2]
+                prompt_w = min(w_f - prompt_x, prompt_w)
+                prompt_h = min(h_f - prompt_y, prompt_h)
+                
+                if prompt_w > 0 and prompt_h > 0:
+                    with trace_stage("segment"):
+                        mask = models.segment(fish_crop_img, seg_model="SAM", bbox=[prompt_x, prompt_y, prompt_w, prompt_h])
+                else:
+                    print("Invalid SAM prompt dimensions, skipping segmentation")
+                    mask = None
             
-            # Save temp crop
-            import time
-            timestamp = int(time.time() * 1000)
-            temp_filename = f"{crop_name_base}_fish_{timestamp}_{i}.jpg"
-            temp_path = os.path.join(crops_dir, temp_filename)
+            if mask is not None:
+                # mask is 0 or 255
+                # Masks are stored in frame coordinates, bring it to the full-resolution crop size
+                if mask.shape[:2] != (fh_new, fw_new):
+                     mask = cv2.resize(mask, (fw_new, fh_new), interpolation=cv2.INTER_NEAREST)
+
+        # Letterbox resize to 640x640 (geometry from the full-resolution crop size)
+        canvas, scale, (x_offset, y_offset), (new_w_resize, new_h_resize) = letterbox_canvas.fit(fish_crop_img, size=(fw_new, fh_new))
+        target_size = letterbox_canvas.size
+        
+        # Save temp crop
+        timestamp = int(time.time() * 1000)
+        temp_filename = f"{crop_name_base}_fish_{timestamp}_{i}.jpg"
+        temp_path = os.path.join(crops_dir, temp_filename)
+        with trace_stage("write_crop"):
             cv2.imwrite(temp_path, canvas)
-            
-            fish_crops.append({
-                "id": f"{timestamp}_{i}",
-                "url": f"/data/crops/{temp_filename}",
-                "bbox": [float(fx_new), float(fy_new), float(fw_new), float(fh_new)],
-                "confidence": conf
-            })
-            
+        
+        fish = {
+            "id": f"{timestamp}_{i}",
+            "url": f"/data/crops/{temp_filename}",
+            "bbox": [float(fx_new), float(fy_new), float(fw_new), float(fh_new)],
+            "confidence": conf
+        }
+
+        if mask is not None:
+            # Top-left of the fish crop in frame coordinates
+            origin = [x + fx_new, y + fy_new]
+            fish["mask"] = encode_rle(mask, origin=origin)
+            fish["polygons"] = mask_to_polygons(mask, origin=origin)
+            fish["letterbox"] = {
+                "origin": origin,
+                "size": target_size,
+                "scale": scale,
+                "offset": [x_offset, y_offset],
+                "resized": [new_w_resize, new_h_resize]
+            }
+
+        fish_crops.append(fish)
+        
     # Sort by confidence descending
     fish_crops.sort(key=lambda x: x['confidence'], reverse=True)
         
@@ -299,11 +413,14 @@ def process_region(request: ProcessRequest):
 class SaveRequest(BaseModel):
     video_name: str
     label: str
-    crops: List[dict] # {url, frame_index, bbox}
+    crops: List[dict] # {url, frame_index, bbox, [mask, polygons, letterbox]}
 
 @router.post("/save")
-def save_annotations(request: SaveRequest):
+async def save_annotations(request: SaveRequest):
     """Save selected crops to annotation directory."""
+    return await io_executor.run(_save_annotations, request)
+
+def _save_annotations(request: SaveRequest):
     print(f"Save Request: Video={request.video_name}, Label={request.label}, Crops={len(request.crops)}")
     
     if not request.label:
@@ -348,6 +465,9 @@ def save_annotations(request: SaveRequest):
                 print(f"Overwriting existing annotation: {f}")
                 try:
                     os.remove(os.path.join(save_dir, f))
+                    if os.path.exists(sidecar_path(os.path.join(save_dir, f))):
+                        os.remove(sidecar_path(os.path.join(save_dir, f)))
+                    _update_stats("remove", request.video_name, request.label, f)
                 except Exception as e:
                     print(f"Failed to remove existing file {f}: {e}")
 
@@ -358,6 +478,16 @@ def save_annotations(request: SaveRequest):
         import shutil
         try:
             shutil.copy2(src_path, dest_path)
+            if crop.get('mask'):
+                # Segmentation mask is stored next to the unmasked crop
+                write_sidecar(dest_path, {
+                    "frame_index": frame_idx,
+                    "bbox": crop['bbox'],
+                    "mask": crop['mask'],
+                    "polygons": crop.get('polygons', []),
+                    "letterbox": crop.get('letterbox')
+                })
+            _update_stats("add", request.video_name, request.label, dest_filename, int(frame_idx))
             print(f"Saved: {dest_path}")
             saved_count += 1
         except Exception as e:
@@ -365,9 +495,20 @@ def save_annotations(request: SaveRequest):
         
     return {"message": f"Saved {saved_count} annotations", "count": saved_count}
 
+def _update_stats(method: str, *args):
+    """Apply a save / delete to the annotation stats, the files stay the source of truth if that fails."""
+    try:
+        getattr(get_annotation_stats(), method)(*args)
+    except Exception as e:
+        # Fixed by the next POST /stats/rebuild
+        print(f"Error updating annotation stats: {e}")
+
 @router.get("/annotations")
-def get_annotations(video_name: str, frame_index: int):
+async def get_annotations(video_name: str, frame_index: int):
     """Get saved annotations for the current frame."""
+    return await io_executor.run(_get_annotations, video_name, frame_index)
+
+def _get_annotations(video_name: str, frame_index: int):
     # Search /mnt/datasets/Marine/Annotations/<VideoName>/*/*.jpg
     # Filter by _frame<Index>_
     
@@ -385,22 +526,30 @@ def get_annotations(video_name: str, frame_index: int):
         for f in os.listdir(label_dir):
             if f.lower().endswith(".jpg") and f"frame{frame_index}_" in f:
                 # Found a match
-                annotations.append({
+                annotation = {
                     "url": f"/static/annotations/{video_name}/{label}/{f}",
                     "label": label,
                     "filename": f
-                })
+                }
+                # Outline for clipping the crop on the client
+                meta = read_sidecar(os.path.join(label_dir, f))
+                if meta:
+                    annotation["polygons"] = meta.get("polygons", [])
+                    annotation["letterbox"] = meta.get("letterbox")
+                annotations.append(annotation)
                 
     return {"annotations": annotations}
-    return {"annotations": annotations}
 
 class DeleteRequest(BaseModel):
     video_name: str
     annotations: List[dict] # {filename, label}
 
 @router.post("/delete_annotations")
-def delete_annotations(request: DeleteRequest):
+async def delete_annotations(request: DeleteRequest):
     """Delete selected annotations."""
+    return await io_executor.run(_delete_annotations, request)
+
+def _delete_annotations(request: DeleteRequest):
     print(f"Delete Request: Video={request.video_name}, Count={len(request.annotations)}")
     
     deleted_count = 0
@@ -419,6 +568,9 @@ def delete_annotations(request: DeleteRequest):
         if os.path.exists(file_path):
             try:
                 os.remove(file_path)
+                if os.path.exists(sidecar_path(file_path)):
+                    os.remove(sidecar_path(file_path))
+                _update_stats("remove", request.video_name, label, filename)
                 print(f"Deleted: {file_path}")
                 deleted_count += 1
             except Exception as e:
@@ -432,6 +584,76 @@ def delete_annotations(request: DeleteRequest):
         
     return {"message": f"Deleted {deleted_count} annotations", "count": deleted_count}
 
+@router.get("/stats")
+async def get_stats():
+    """Annotation counts per video and label, with each video's frame count for progress."""
+    return await io_executor.run(_get_stats)
+
+def _get_stats():
+    summary = get_annotation_stats().summary()
+    annotated = summary["videos"]
+
+    videos = []
+    names = [os.path.splitext(v.filename)[0] for v in _list_videos()]
+    # Annotated videos whose file is gone are still reported
+    names += sorted(set(annotated) - set(names))
+    # Frame counts come from the stats DB, not from parsing every video's frame index
+    totals = get_annotation_stats().frame_totals(names, settings.FRAME_CACHE_DIR)
+    for video_name in names:
+        stats = annotated.get(video_name, {"annotations": 0, "labels": {}, "annotated_frames": 0})
+        total_frames = totals[video_name]
+        videos.append({
+            "video_name": video_name,
+            "annotations": stats["annotations"],
+            "annotated_frames": stats["annotated_frames"],
+            "total_frames": total_frames,
+            "coverage": round(stats["annotated_frames"] / total_frames, 4) if total_frames else None,
+            "labels": stats["labels"],
+        })
+
+    labels = {}
+    for video in videos:
+        for label, counts in video["labels"].items():
+            labels[label] = labels.get(label, 0) + counts["annotations"]
+
+    return {
+        "videos": videos,
+        "labels": labels,
+        "annotations": sum(v["annotations"] for v in videos),
+        "built_at": summary["built_at"],
+    }
+
+@router.get("/stats/timeline")
+async def get_stats_timeline(video_name: str, bins: int = 50):
+    """Annotation coverage of one video in `bins` ranges along its frame list (for a heatmap)."""
+    return await io_executor.run(_get_stats_timeline, video_name, bins)
+
+def _get_stats_timeline(video_name: str, bins: int):
+    if bins <= 0:
+        raise HTTPException(status_code=400, detail="bins must be positive")
+    frame_counts = get_annotation_stats().frame_counts(video_name)
+    index = cached_frame_index(os.path.join(settings.FRAME_CACHE_DIR, video_name))
+    total_frames = len(index["frames"]) if index else 0
+    timestamps = index["timestamps"] if index else None
+
+    labels = {}
+    for frame_labels in frame_counts.values():
+        for label, count in frame_labels.items():
+            labels[label] = labels.get(label, 0) + count
+
+    return {
+        "video_name": video_name,
+        "total_frames": total_frames,
+        "annotated_frames": len(frame_counts),
+        "labels": labels,
+        "bins": coverage_bins(frame_counts, total_frames, bins, timestamps),
+    }
+
+@router.post("/stats/rebuild")
+async def rebuild_stats():
+    """Rebuild the annotation stats from the annotation directory (after files were changed by hand)."""
+    return await bulk_executor.run(get_annotation_stats().rebuild)
+
 
 from fastapi.responses import FileResponse
 from fastapi.background import BackgroundTasks
@@ -441,10 +663,15 @@ import tempfile
 
 class ExportRequest(BaseModel):
     video_names: List[str]
+    # Black out the background of crops that have a segmentation mask (mask JSONs are exported too)
+    apply_masks: bool = True
 
 @router.post("/export")
-def export_annotations_endpoint(request: ExportRequest, background_tasks: BackgroundTasks):
+async def export_annotations_endpoint(request: ExportRequest, background_tasks: BackgroundTasks):
     """Export annotations for selected videos as a zip file."""
+    return await bulk_executor.run(_export_annotations, request, background_tasks)
+
+def _export_annotations(request: ExportRequest, background_tasks: BackgroundTasks):
     if not request.video_names:
         raise HTTPException(status_code=400, detail="No videos selected")
 
@@ -467,6 +694,14 @@ def export_annotations_endpoint(request: ExportRequest, background_tasks: Backgr
                             # Arcname should be relative to ANNOTATION_DIR so we get folder structure
                             # e.g. video_name/file.json
                             arcname = os.path.relpath(file_path, settings.ANNOTATION_DIR)
+                            if request.apply_masks and file.lower().endswith(".jpg"):
+                                meta = read_sidecar(file_path)
+                                if meta and meta.get("mask") and meta.get("letterbox"):
+                                    masked = apply_mask_to_crop(cv2.imread(file_path), meta["mask"], meta["letterbox"])
+                                    ok, buf = cv2.imencode(".jpg", masked)
+                                    if ok:
+                                        zipf.writestr(arcname, buf.tobytes())
+                                        continue
                             zipf.write(file_path, arcname)
         
         # Cleanup temp dir after response
@@ -482,7 +717,7 @@ def export_annotations_endpoint(request: ExportRequest, background_tasks: Backgr
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
 
 
-from core.transcription import transcribe_video
+from core.transcript_index import get_transcript_index
 
 class TranscriptionRequest(BaseModel):
     video_name: str
@@ -490,8 +725,11 @@ class TranscriptionRequest(BaseModel):
     force: bool = False
 
 @router.post("/transcribe")
-def transcribe_endpoint(request: TranscriptionRequest):
+async def transcribe_endpoint(request: TranscriptionRequest):
     """Transcribe the selected video."""
+    return await batch_executor.run(_transcribe, request)
+
+def _transcribe(request: TranscriptionRequest):
     video_path = os.path.join(settings.VIDEO_DIR, request.video_name)
     if not os.path.exists(video_path):
         # Try adding .MP4 if missing
@@ -502,15 +740,39 @@ def transcribe_endpoint(request: TranscriptionRequest):
              raise HTTPException(status_code=404, detail=f"Video not found: {request.video_name}")
 
     try:
-        segments = transcribe_video(video_path, request.video_name, model_name=request.model, force=request.force)
+        segments = models.transcribe(video_path, request.video_name, model_name=request.model, force=request.force)
         return {"segments": segments}
+    except ExecutorBusy:
+        raise
     except Exception as e:
         print(f"Transcription error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/transcription/search")
+async def search_transcriptions(q: str, video_name: str = None, limit: int = 50):
+    """Search transcription segments of all videos (or one video) by text."""
+    await bulk_executor.run(get_transcript_index().sync)
+    return await io_executor.run(_search_transcriptions, q, video_name, limit)
+
+def _search_transcriptions(q: str, video_name: str, limit: int):
+    return {"results": get_transcript_index().search(q, video_name=video_name, limit=limit)}
+
+@router.get("/transcription/at")
+async def get_transcription_at(video_name: str, timestamp: float, padding: float = 0.0):
+    """Get the transcription segments that overlap a timestamp (seconds) of a video, e.g. of the current frame."""
+    # Indexing new transcriptions (throttled, usually a no-op) runs on the bulk pool, the lookup on io
+    await bulk_executor.run(get_transcript_index().sync)
+    return await io_executor.run(_get_transcription_at, video_name, timestamp, padding)
+
+def _get_transcription_at(video_name: str, timestamp: float, padding: float):
+    return {"segments": get_transcript_index().segments_at(video_name, timestamp, padding=padding)}
+
 @router.get("/transcription")
-def get_transcription(video_name: str):
+async def get_transcription(video_name: str):
     """Get existing transcription for video."""
+    return await io_executor.run(_get_transcription, video_name)
+
+def _get_transcription(video_name: str):
     save_path = os.path.join(settings.TRANSCRIPTION_DIR, video_name, "transcription.json")
     print(f"Checking transcription at: {save_path}")
     if os.path.exists(save_path):
@@ -1,3 +1,58 @@
-# Global dictionary to store progress of long-running tasks
-# Key: video_name, Value: integer percentage (0-100)
-progress_store = {}
+import os
+import sqlite3
+import threading
+from config import settings
+
+def open_sqlite(db_path: str) -> sqlite3.Connection:
+    """Open a SQLite connection in autocommit mode, set up for concurrent access from several processes."""
+    db_dir = os.path.dirname(db_path)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class ProgressStore:
+    """
+    Dict-like store for progress of long-running tasks.
+    Backed by SQLite so that every uvicorn worker (and preprocess_videos.py) sees the same values.
+    Key: video_name, Value: integer percentage (0-100)
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads, keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = open_sqlite(self.db_path)
+            conn.execute("CREATE TABLE IF NOT EXISTS progress (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def __setitem__(self, key: str, value: int):
+        self._connect().execute(
+            "INSERT INTO progress (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, int(value)),
+        )
+
+    def __getitem__(self, key: str) -> int:
+        row = self._connect().execute("SELECT value FROM progress WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return row[0]
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+# Global store of progress of long-running tasks
+progress_store = ProgressStore(settings.STATE_DB_PATH)
@@ -0,0 +1,53 @@
+import os
+from starlette.datastructures import Headers
+from starlette.staticfiles import StaticFiles
+
+# Pre-compressed variants we can serve in place of a .jpg, best first
+VARIANT_MEDIA_TYPES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+}
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles for content-addressed images (frames, crops, saved annotations).
+    - Sets long-lived Cache-Control so revisits are served from the browser cache.
+    - ETag / Last-Modified conditional requests and Range requests are handled by Starlette's FileResponse.
+    - Serves a pre-compressed .avif/.webp next to the .jpg when the browser accepts it.
+    """
+    def __init__(self, *args, max_age: int = 31536000, immutable: bool = True, variants: list = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = f"public, max-age={max_age}" + (", immutable" if immutable else "")
+        self.variants = [v for v in VARIANT_MEDIA_TYPES if v in (variants or [])]
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        full_path = str(full_path)
+        negotiable = bool(self.variants) and full_path.lower().endswith(".jpg")
+        media_type = None
+        if negotiable:
+            full_path, stat_result, media_type = self._find_variant(full_path, stat_result, scope)
+
+        response = super().file_response(full_path, stat_result, scope, status_code)
+
+        response.headers["Cache-Control"] = self.cache_control
+        if negotiable:
+            # Same URL, different bytes depending on Accept
+            response.headers["Vary"] = "Accept"
+        if media_type and response.status_code != 304:
+            response.headers["Content-Type"] = media_type
+        return response
+
+    def _find_variant(self, full_path: str, stat_result, scope):
+        """Return (path, stat, media_type) of the best accepted variant, or the original JPEG."""
+        accept = Headers(scope=scope).get("accept", "")
+        base = os.path.splitext(full_path)[0]
+        for variant in self.variants:
+            media_type = VARIANT_MEDIA_TYPES[variant]
+            if media_type not in accept:
+                continue
+            variant_path = f"{base}.{variant}"
+            try:
+                return variant_path, os.stat(variant_path), media_type
+            except OSError:
+                continue
+        return full_path, stat_result, None
@@ -0,0 +1,144 @@
+"""
+Compare CPU inference backends of the detector: latency and drift against the torch path.
+
+For each backend (torch, onnx, openvino, optionally INT8) the configured YOLO weights are
+exported once (cached next to the .pt), then every image is run through
+YOLOModel.predict_boxes, the same call /process uses. Detections are matched to the torch
+detections by IoU to report recall, mean IoU and confidence drift.
+
+Usage:
+    python benchmarks/bench_inference_backends.py --images "/mnt/datasets/AnnotationTool/VideoFrame/GX010103/*.jpg"
+    python benchmarks/bench_inference_backends.py --backends torch onnx openvino --int8 --threads 4
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(values, p):
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+def iou(a, b):
+    ax1, ay1, ax2, ay2 = a
+    bx1, by1, bx2, by2 = b
+    iw = max(0.0, min(ax2, bx2) - max(ax1, bx1))
+    ih = max(0.0, min(ay2, by2) - max(ay1, by1))
+    inter = iw * ih
+    union = (ax2 - ax1) * (ay2 - ay1) + (bx2 - bx1) * (by2 - by1) - inter
+    return inter / union if union > 0 else 0.0
+
+def drift(reference: list, candidate: list, iou_threshold: float = 0.5) -> dict:
+    """Greedy IoU matching of candidate detections to reference detections of one image."""
+    matched_ious = []
+    conf_diffs = []
+    used = set()
+    for ref in sorted(reference, key=lambda d: -d["conf"]):
+        best, best_iou = None, iou_threshold
+        for j, cand in enumerate(candidate):
+            if j in used:
+                continue
+            value = iou(ref["xyxy"], cand["xyxy"])
+            if value >= best_iou:
+                best, best_iou = j, value
+        if best is not None:
+            used.add(best)
+            matched_ious.append(best_iou)
+            conf_diffs.append(abs(ref["conf"] - candidate[best]["conf"]))
+    return {
+        "reference": len(reference),
+        "candidate": len(candidate),
+        "matched": len(matched_ious),
+        "ious": matched_ious,
+        "conf_diffs": conf_diffs,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="Glob of frame images")
+    parser.add_argument("--max-images", type=int, default=100)
+    parser.add_argument("--weights", default=None, help="Default: YOLO_MODEL_PATH")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "openvino"])
+    parser.add_argument("--int8", action="store_true", help="Also benchmark INT8 variants of non-torch backends")
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads (default: INFERENCE_THREADS)")
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    args = parser.parse_args()
+
+    import cv2
+    from config import settings
+    from core.ai_models import YOLOModel
+
+    weights = args.weights or settings.YOLO_MODEL_PATH
+    paths = sorted(glob.glob(args.images))[:args.max_images]
+    if not paths:
+        sys.exit(f"No images match {args.images}")
+    images = [cv2.imread(p) for p in paths]
+
+    variants = [("torch", False)] if "torch" in args.backends else []
+    for backend in args.backends:
+        if backend == "torch":
+            continue
+        variants.append((backend, False))
+        if args.int8:
+            variants.append((backend, True))
+
+    detections = {}
+    results = {"weights": weights, "images": len(images), "backends": {}}
+    for backend, int8 in variants:
+        name = f"{backend}-int8" if int8 else backend
+        try:
+            model = YOLOModel(weights, backend=backend, int8=int8, threads=args.threads)
+        except Exception as e:
+            print(f"Skipping {name}: {e}")
+            continue
+        if model.backend != backend:
+            print(f"Skipping {name}: export failed, model fell back to {model.backend}")
+            continue
+
+        timings = []
+        outputs = []
+        for image in images:
+            start = time.perf_counter()
+            outputs.append(model.predict_boxes(image, conf=args.conf))
+            timings.append(time.perf_counter() - start)
+        detections[name] = outputs
+
+        results["backends"][name] = {
+            "model_path": model.model_path,
+            "p50_ms": round(percentile(timings, 50) * 1000, 2),
+            "p99_ms": round(percentile(timings, 99) * 1000, 2),
+            "mean_ms": round(statistics.mean(timings) * 1000, 2),
+        }
+
+    if "torch" in detections:
+        for name, outputs in detections.items():
+            if name == "torch":
+                continue
+            per_image = [drift(ref, cand) for ref, cand in zip(detections["torch"], outputs)]
+            reference = sum(d["reference"] for d in per_image)
+            matched = sum(d["matched"] for d in per_image)
+            ious = [v for d in per_image for v in d["ious"]]
+            conf_diffs = [v for d in per_image for v in d["conf_diffs"]]
+            results["backends"][name]["drift_vs_torch"] = {
+                "torch_detections": reference,
+                "detections": sum(d["candidate"] for d in per_image),
+                "recall": round(matched / reference, 4) if reference else None,
+                "mean_iou": round(statistics.mean(ious), 4) if ious else None,
+                "mean_conf_diff": round(statistics.mean(conf_diffs), 4) if conf_diffs else None,
+                "max_conf_diff": round(max(conf_diffs), 4) if conf_diffs else None,
+            }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Load test: latency of /annotations while frame extraction is running.
+
+Starts extraction of the given videos through /frames (use videos that are not cached yet,
+or point FRAME_CACHE_DIR of the server at an empty directory), and meanwhile polls
+/annotations from several threads. Prints p50/p99 latency of /annotations while extraction
+was in flight and after it finished.
+
+Usage:
+    python benchmarks/load_annotations.py --video /path/to/a.MP4 --video /path/to/b.MP4
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+def get(url, timeout=600):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as res:
+            res.read()
+            status = res.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+def get_json(url, timeout=600):
+    with urllib.request.urlopen(url, timeout=timeout) as res:
+        return json.loads(res.read())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000/api")
+    parser.add_argument("--video", action="append", required=True, help="Video path to extract (repeatable)")
+    parser.add_argument("--video-name", default=None, help="Video name for /annotations (default: first video)")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent /annotations clients")
+    parser.add_argument("--tail", type=float, default=5.0, help="Seconds to keep polling after extraction finished")
+    parser.add_argument("--poll", type=float, default=1.0, help="Seconds between /frames polls while extraction runs")
+    args = parser.parse_args()
+
+    video_name = args.video_name or os.path.splitext(os.path.basename(args.video[0]))[0]
+    ann_url = f"{args.base_url}/annotations?" + urllib.parse.urlencode({"video_name": video_name, "frame_index": 0})
+
+    extracting = threading.Event()
+    extracting.set()
+    stop = threading.Event()
+    samples = {"during": [], "after": []}
+    statuses = {}
+    lock = threading.Lock()
+
+    def extraction(video_path):
+        # /frames answers after the first chunk, poll (one row per page) until the whole video is extracted
+        url = f"{args.base_url}/frames?" + urllib.parse.urlencode({"video_path": video_path, "limit": 1})
+        start = time.perf_counter()
+        while True:
+            try:
+                page = get_json(url)
+            except urllib.error.HTTPError as e:
+                print(f"/frames {os.path.basename(video_path)}: status={e.code} {time.perf_counter() - start:.1f}s")
+                return
+            if page.get("complete", True):
+                break
+            time.sleep(args.poll)
+        print(f"/frames {os.path.basename(video_path)}: {page['total']} frames in {time.perf_counter() - start:.1f}s")
+
+    def poller():
+        while not stop.is_set():
+            phase = "during" if extracting.is_set() else "after"
+            status, elapsed = get(ann_url, timeout=60)
+            with lock:
+                samples[phase].append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    extractors = [threading.Thread(target=extraction, args=(v,)) for v in args.video]
+    pollers = [threading.Thread(target=poller, daemon=True) for _ in range(args.clients)]
+    for t in pollers:
+        t.start()
+    for t in extractors:
+        t.start()
+    for t in extractors:
+        t.join()
+    extracting.clear()
+    time.sleep(args.tail)
+    stop.set()
+    for t in pollers:
+        t.join()
+
+    report = {"statuses": statuses}
+    for phase, values in samples.items():
+        report[phase] = {
+            "requests": len(values),
+            "p50_ms": round(percentile(values, 50) * 1000, 2) if values else None,
+            "p99_ms": round(percentile(values, 99) * 1000, 2) if values else None,
+            "max_ms": round(max(values) * 1000, 2) if values else None,
+        }
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
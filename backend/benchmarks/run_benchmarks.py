@@ -0,0 +1,290 @@
+"""
+Benchmark suite for the annotation hot path. Needs no GPU, no network and no weights.
+
+Generates a synthetic video with OpenCV, replaces the models with a deterministic stub
+detector/segmenter and measures:
+  - extract_frames throughput
+  - /process latency (p50/p99) for several detected box counts
+  - /save and /annotations latency as the number of saved annotations grows
+  - /export throughput
+
+Results are written to JSON (benchmarks/results/<timestamp>.json by default) and can be
+compared with a previous run:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<old>.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(values, p):
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+def summarize(values):
+    """Latency summary in milliseconds."""
+    return {
+        "n": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "mean_ms": round(statistics.mean(values) * 1000, 3),
+    }
+
+def make_synthetic_video(path: str, seconds: int, fps: int, width: int, height: int):
+    """Write an mp4 with textured background and a few moving 'fish' ellipses."""
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    background = rng.integers(40, 120, size=(height, width, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for i in range(seconds * fps):
+        frame = background.copy()
+        for k in range(5):
+            cx = int((i * (3 + k) + k * width / 5) % width)
+            cy = int(height * (0.2 + 0.15 * k))
+            cv2.ellipse(frame, (cx, cy), (width // 20, height // 30), 0, 0, 360, (30 * k, 200, 255 - 30 * k), -1)
+        writer.write(frame)
+    writer.release()
+
+class StubModels:
+    """Same interface as core.model_service.LocalModels, returns `box_count` fixed boxes."""
+    def __init__(self, box_count: int = 1):
+        self.box_count = box_count
+
+    def status(self) -> dict:
+        return {"yolo": True, "yolo_seg": True, "sam": True}
+
+    def device_stats(self) -> dict:
+        from core.device_scheduler import get_scheduler
+        return get_scheduler().stats()
+
+    def detect(self, image, conf: float = 0.25) -> list:
+        h, w = image.shape[:2]
+        bw, bh = w / 8, h / 8
+        detections = []
+        for i in range(self.box_count):
+            x = (i * bw * 0.9) % (w - bw)
+            y = ((i // 8) * bh * 0.9) % (h - bh)
+            detections.append({"xyxy": [x, y, x + bw, y + bh], "conf": 0.9 - i * 0.001})
+        return detections
+
+    def detect_batch(self, images: list, conf: float = 0.25, imgsz: int = None) -> list:
+        return [self.detect(image, conf=conf) for image in images]
+
+    def segment(self, image, seg_model: str = "YOLO", bbox: list = None):
+        import cv2
+        import numpy as np
+        h, w = image.shape[:2]
+        mask = np.zeros((h, w), dtype=np.uint8)
+        cv2.ellipse(mask, (w // 2, h // 2), (max(1, w // 3), max(1, h // 3)), 0, 0, 360, 255, -1)
+        return mask
+
+    def transcribe(self, video_path: str, video_name: str, model_name: str = "large", force: bool = False) -> list:
+        return []
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return None
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="fish_bench_")
+    # Settings are read at import time, point everything at the scratch directory first
+    os.environ.update({
+        "VIDEO_DIR": os.path.join(workdir, "videos"),
+        "FRAME_CACHE_DIR": os.path.join(workdir, "frames"),
+        "ANNOTATION_DIR": os.path.join(workdir, "annotations"),
+        "TRANSCRIPTION_DIR": os.path.join(workdir, "transcriptions"),
+        "STATE_DB_PATH": os.path.join(workdir, "state.db"),
+        "MODEL_SERVER_ADDRESS": "",
+    })
+    for d in ("videos", "frames", "annotations", "transcriptions"):
+        os.makedirs(os.path.join(workdir, d), exist_ok=True)
+    # main.py and /process use paths relative to the working directory (data/crops)
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+
+    import cv2
+    from core import model_service
+    stub = StubModels()
+    model_service._models = stub
+
+    from fastapi.testclient import TestClient
+    from core.video_processing import extract_frames
+    from main import app
+
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv": cv2.__version__,
+            "args": vars(args),
+        }
+    }
+
+    try:
+        video_name = "bench"
+        video_path = os.path.join(workdir, "videos", f"{video_name}.MP4")
+        make_synthetic_video(video_path, args.seconds, args.fps, args.width, args.height)
+
+        # 1. extract_frames throughput (cold cache)
+        out_dir = os.path.join(workdir, "extract_only")
+        start = time.perf_counter()
+        frames = extract_frames(video_path, out_dir, rate=1.0)
+        elapsed = time.perf_counter() - start
+        results["extract_frames"] = {
+            "video_seconds": args.seconds,
+            "frames": len(frames),
+            "seconds": round(elapsed, 3),
+            "frames_per_second": round(len(frames) / elapsed, 2) if elapsed > 0 else None,
+        }
+
+        client = TestClient(app)
+        res = client.get("/api/frames", params={"video_path": video_path})
+        res.raise_for_status()
+        frame_urls = res.json()["frames"]
+
+        # 2. /process latency by box count
+        results["process"] = {}
+        last_crops = []
+        for box_count in args.box_counts:
+            stub.box_count = box_count
+            timings = []
+            for i in range(args.iterations):
+                body = {"frame_url": frame_urls[i % len(frame_urls)], "bbox": [0, 0, 1, 1], "conf_threshold": 0.25}
+                start = time.perf_counter()
+                res = client.post("/api/process", json=body)
+                timings.append(time.perf_counter() - start)
+                res.raise_for_status()
+                last_crops = res.json()["fish"]
+            results["process"][str(box_count)] = summarize(timings)
+
+        # 3. /save and /annotations as annotation volume grows
+        results["annotations"] = {}
+        saved = 0
+        frame_index = 0
+        for volume in args.volumes:
+            save_timings = []
+            while saved < volume and last_crops:
+                crops = [{"url": c["url"], "bbox": c["bbox"], "frame_index": frame_index} for c in last_crops]
+                start = time.perf_counter()
+                res = client.post("/api/save", json={"video_name": video_name, "label": f"label{frame_index % 5}", "crops": crops})
+                save_timings.append(time.perf_counter() - start)
+                res.raise_for_status()
+                saved += res.json()["count"]
+                frame_index += 1
+
+            get_timings = []
+            for i in range(args.iterations):
+                start = time.perf_counter()
+                res = client.get("/api/annotations", params={"video_name": video_name, "frame_index": i % max(1, frame_index)})
+                get_timings.append(time.perf_counter() - start)
+                res.raise_for_status()
+
+            results["annotations"][str(volume)] = {
+                "saved": saved,
+                "save": summarize(save_timings) if save_timings else None,
+                "get": summarize(get_timings),
+            }
+
+        # 4. /export throughput
+        start = time.perf_counter()
+        res = client.post("/api/export", json={"video_names": [video_name]})
+        elapsed = time.perf_counter() - start
+        res.raise_for_status()
+        results["export"] = {
+            "annotations": saved,
+            "bytes": len(res.content),
+            "seconds": round(elapsed, 3),
+            "annotations_per_second": round(saved / elapsed, 2) if elapsed > 0 else None,
+        }
+    finally:
+        os.chdir(BACKEND_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+def flatten(d, prefix=""):
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            out.update(flatten(v, key))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = v
+    return out
+
+def compare(old: dict, new: dict, threshold: float) -> list:
+    """Print metric changes and return the metrics that regressed by more than threshold."""
+    old_flat = flatten({k: v for k, v in old.items() if k != "meta"})
+    new_flat = flatten({k: v for k, v in new.items() if k != "meta"})
+    regressions = []
+    for key in sorted(new_flat):
+        if key not in old_flat or not old_flat[key]:
+            continue
+        change = (new_flat[key] - old_flat[key]) / old_flat[key]
+        # Latencies and durations are better when lower, throughputs when higher
+        lower_is_better = key.endswith("_ms") or key.endswith(".seconds")
+        higher_is_better = key.endswith("_per_second")
+        regressed = (lower_is_better and change > threshold) or (higher_is_better and change < -threshold)
+        if lower_is_better or higher_is_better:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{key:45s} {old_flat[key]:>12} -> {new_flat[key]:>12} ({change:+.1%}){flag}")
+        if regressed:
+            regressions.append(key)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=30, help="Length of the synthetic video")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--iterations", type=int, default=50, help="Requests per latency measurement")
+    parser.add_argument("--box-counts", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--volumes", type=int, nargs="+", default=[10, 100, 1000], help="Saved annotation counts")
+    parser.add_argument("--output", default=None, help="Result JSON path")
+    parser.add_argument("--compare", default=None, help="Previous result JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    # run() changes the working directory, resolve user paths first
+    output = os.path.abspath(args.output) if args.output else os.path.join(
+        BACKEND_DIR, "benchmarks", "results", datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + ".json"
+    )
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    results = run(args)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+    if compare_path:
+        with open(compare_path, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        regressions = compare(old, results, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Simulate the device scheduler (core/device_scheduler.py) on the CPU.
+
+No model is loaded: jobs lease a device from a DeviceScheduler built from a device spec and
+sleep for as long as the job would take on it. Interactive clients send /process-like detect
+calls with a think time in between, batch workers run transcription (accelerator only) and
+fish gate batches (CPU fallback allowed) back to back. Reports wait p50/p99 per class, where
+the jobs ran and the CPU fallbacks, --fifo runs the same load with a single priority.
+
+Usage:
+    python benchmarks/simulate_device_scheduler.py
+    python benchmarks/simulate_device_scheduler.py --devices "gpu0@cpu=8000/1,gpu1@cpu=8000/1,cpu=0/2" --fifo
+"""
+import argparse
+import collections
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(values, p):
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+# (job, priority class, CPU fallback, seconds on an accelerator, seconds on the CPU)
+JOBS = {
+    "detect": ("yolo", "interactive", True, 0.02, 0.15),
+    "gate": ("yolo", "batch", True, 0.08, 0.6),
+    "transcribe": ("whisper-small", "batch", False, 0.5, None),
+}
+
+def run(devices_spec: str, seconds: float, clients: int, think: float, gate_workers: int, transcribe_workers: int, fifo: bool) -> dict:
+    from core.device_scheduler import DeviceScheduler, parse_devices, INTERACTIVE, BATCH
+
+    scheduler = DeviceScheduler(parse_devices(devices_spec), timeout=60)
+    waits = collections.defaultdict(list)
+    placements = collections.Counter()
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def worker(kind: str, pause: float):
+        job, cls, fallback, accel_seconds, cpu_seconds = JOBS[kind]
+        priority = BATCH if fifo or cls == "batch" else INTERACTIVE
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            with scheduler.lease(job, priority, fallback=fallback) as device:
+                waited = time.perf_counter() - start
+                time.sleep(accel_seconds if device.accelerator else cpu_seconds)
+            with lock:
+                waits[kind].append(waited)
+                placements[f"{kind}@{device.name}"] += 1
+            if pause:
+                time.sleep(pause)
+
+    threads = [threading.Thread(target=worker, args=("detect", think)) for _ in range(clients)]
+    threads += [threading.Thread(target=worker, args=("gate", 0)) for _ in range(gate_workers)]
+    threads += [threading.Thread(target=worker, args=("transcribe", 0)) for _ in range(transcribe_workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = scheduler.stats()
+    return {
+        "mode": "fifo" if fifo else "priority",
+        "jobs": {
+            kind: {
+                "count": len(values),
+                "wait_p50_ms": round(percentile(values, 50) * 1000, 2),
+                "wait_p99_ms": round(percentile(values, 99) * 1000, 2),
+            } for kind, values in waits.items() if values
+        },
+        "placements": dict(placements),
+        "cpu_fallbacks": stats["cpu_fallbacks"],
+        "rejected": stats["rejected"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", default="gpu0@cpu=8000/1,cpu=0/2", help="Device spec, see DEVICES in config.py")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=4, help="Interactive detect clients")
+    parser.add_argument("--think", type=float, default=0.1, help="Seconds between requests of a client")
+    parser.add_argument("--gate-workers", type=int, default=2)
+    parser.add_argument("--transcribe-workers", type=int, default=1)
+    parser.add_argument("--fifo", action="store_true", help="Also run with interactive and batch at the same priority")
+    args = parser.parse_args()
+
+    modes = [False, True] if args.fifo else [False]
+    results = [
+        run(args.devices, args.seconds, args.clients, args.think, args.gate_workers, args.transcribe_workers, fifo)
+        for fifo in modes
+    ]
+    print(json.dumps({"devices": args.devices, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -10,4 +10,92 @@ class Settings:
     YOLO_SEG_MODEL_PATH: str = os.getenv("YOLO_SEG_MODEL_PATH", "../weights/seg/seg.pt")
     SAM2_MODEL_PATH: str = os.getenv("SAM2_MODEL_PATH", "../weights/sam2.1_l.pt")
 
+    # Inference backend of the YOLO detector / segmenter: "torch", "onnx" or "openvino".
+    # ONNX / OpenVINO exports are created once and cached next to the .pt file.
+    INFERENCE_BACKEND: str = os.getenv("INFERENCE_BACKEND", "torch")
+    INFERENCE_THREADS: int = int(os.getenv("INFERENCE_THREADS", "0"))  # 0 = half of the CPU cores
+    INFERENCE_INT8: bool = os.getenv("INFERENCE_INT8", "0") == "1"
+    # Calibration dataset yaml for OpenVINO INT8 export
+    INFERENCE_INT8_DATA: str = os.getenv("INFERENCE_INT8_DATA", "")
+
+    # Shared state (progress etc.) lives in SQLite so that all uvicorn workers see it
+    STATE_DB_PATH: str = os.getenv("STATE_DB_PATH", "state/state.db")
+    # When set (a socket path in a private directory), API workers do not load models
+    # themselves but call the model server started by model_server.py
+    MODEL_SERVER_ADDRESS: str = os.getenv("MODEL_SERVER_ADDRESS", "")
+    # Shared secret of the model server connection, start_server.sh generates one per launch.
+    # Required: the connection exchanges pickles, a known key would let any local user run code in the server.
+    MODEL_SERVER_AUTHKEY: str = os.getenv("MODEL_SERVER_AUTHKEY", "")
+    # Seconds to wait for a model server answer (transcription of a long video gets its own, longer limit)
+    MODEL_SERVER_TIMEOUT: float = float(os.getenv("MODEL_SERVER_TIMEOUT", "600"))
+    MODEL_SERVER_TRANSCRIBE_TIMEOUT: float = float(os.getenv("MODEL_SERVER_TRANSCRIBE_TIMEOUT", "14400"))
+    # Search index over all transcriptions (see core/transcript_index.py)
+    TRANSCRIPT_INDEX_PATH: str = os.getenv("TRANSCRIPT_INDEX_PATH", "state/transcripts.db")
+    # Annotation counts per video / label / frame (see core/annotation_stats.py)
+    ANNOTATION_STATS_PATH: str = os.getenv("ANNOTATION_STATS_PATH", "state/annotation_stats.db")
+
+    # Devices models run on (see core/device_scheduler.py), "name[@torch_device]=memory_mb/slots,...",
+    # e.g. "cuda:0=24000/2,cpu=0/4". Empty = all CUDA devices + CPU. "gpu0@cpu=8000/1,cpu=0/2"
+    # simulates an accelerator on a CPU-only machine.
+    DEVICES: str = os.getenv("DEVICES", "")
+    DEVICE_CPU_SLOTS: int = int(os.getenv("DEVICE_CPU_SLOTS", "4"))
+    # Model calls waiting longer than this for a device fail with 503
+    DEVICE_WAIT_TIMEOUT: float = float(os.getenv("DEVICE_WAIT_TIMEOUT", "300"))
+
+    # Bounded executors for blocking work (see core/executors.py).
+    # Requests beyond workers + queue are rejected with 503 instead of piling up.
+    IO_WORKERS: int = int(os.getenv("IO_WORKERS", "8"))
+    IO_QUEUE: int = int(os.getenv("IO_QUEUE", "64"))
+    CPU_WORKERS: int = int(os.getenv("CPU_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+    CPU_QUEUE: int = int(os.getenv("CPU_QUEUE", "8"))
+    INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", "2"))
+    INFERENCE_QUEUE: int = int(os.getenv("INFERENCE_QUEUE", "16"))
+    # Long batch model work (transcription), kept off the inference threads /process runs on
+    BATCH_WORKERS: int = int(os.getenv("BATCH_WORKERS", "2"))
+    BATCH_QUEUE: int = int(os.getenv("BATCH_QUEUE", "8"))
+    # Bulk file work (export, stats rebuild, transcript indexing), kept off the io threads /annotations uses
+    BULK_WORKERS: int = int(os.getenv("BULK_WORKERS", "2"))
+    BULK_QUEUE: int = int(os.getenv("BULK_QUEUE", "8"))
+
+    # Frame sampling: "fixed" (one frame per second) or "adaptive" (where motion / scene changes peak)
+    FRAME_SAMPLING_MODE: str = os.getenv("FRAME_SAMPLING_MODE", "fixed")
+    # Frames per video in adaptive mode, 0 = same count as fixed-rate sampling
+    FRAME_BUDGET: int = int(os.getenv("FRAME_BUDGET", "0"))
+    ADAPTIVE_ANALYSIS_FPS: float = float(os.getenv("ADAPTIVE_ANALYSIS_FPS", "5"))
+    ADAPTIVE_ANALYSIS_WIDTH: int = int(os.getenv("ADAPTIVE_ANALYSIS_WIDTH", "160"))
+    ADAPTIVE_MIN_GAP: float = float(os.getenv("ADAPTIVE_MIN_GAP", "0.5"))  # seconds
+    ADAPTIVE_MAX_GAP: float = float(os.getenv("ADAPTIVE_MAX_GAP", "10"))  # seconds
+
+    # Extraction runs in chunks of this many seconds of video. The frame index is checkpointed after
+    # each chunk: frames are served while the rest is extracted, interrupted extractions resume.
+    EXTRACTION_CHUNK_SECONDS: float = float(os.getenv("EXTRACTION_CHUNK_SECONDS", "60"))
+    # An extraction lock not refreshed for this long belongs to a dead process and is taken over
+    EXTRACTION_LOCK_STALE: float = float(os.getenv("EXTRACTION_LOCK_STALE", "300"))  # seconds
+    # How long /frames waits for the first chunk of a new video before answering with no frames
+    EXTRACTION_FIRST_CHUNK_WAIT: float = float(os.getenv("EXTRACTION_FIRST_CHUNK_WAIT", "30"))  # seconds
+
+    # Keep only frames with fish during extraction. The detector runs on batches of downscaled
+    # frames, per-frame fish counts are written to fish_index.json in the frame directory.
+    EXTRACTION_FISH_GATE: bool = os.getenv("EXTRACTION_FISH_GATE", "0") == "1"
+    FISH_GATE_BATCH: int = int(os.getenv("FISH_GATE_BATCH", "8"))
+    FISH_GATE_IMGSZ: int = int(os.getenv("FISH_GATE_IMGSZ", "416"))
+    FISH_GATE_CONF: float = float(os.getenv("FISH_GATE_CONF", "0.5"))
+
+    # Memory bound for decoded images in /process (see core/region_pipeline.py). Requests wait up to
+    # REGION_MEMORY_TIMEOUT seconds for room in the budget, then get 503.
+    REGION_MEMORY_BUDGET_MB: int = int(os.getenv("REGION_MEMORY_BUDGET_MB", "512"))
+    REGION_MEMORY_TIMEOUT: float = float(os.getenv("REGION_MEMORY_TIMEOUT", "30"))
+    # Decode large regions at 1/2, 1/4 or 1/8 resolution when that still leaves 640 pixels across
+    REGION_REDUCED_DECODE: bool = os.getenv("REGION_REDUCED_DECODE", "1") == "1"
+
+    # Profiling (see core/profiling.py): API requests slower than this are logged with a per-stage
+    # trace (0 = off). /api/admin/* requires the X-Admin-Token header when ADMIN_TOKEN is set.
+    SLOW_REQUEST_MS: float = float(os.getenv("SLOW_REQUEST_MS", "2000"))
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+
+    # HTTP caching of frames / crops / annotations (see api/static_files.py)
+    STATIC_MAX_AGE: int = int(os.getenv("STATIC_MAX_AGE", "31536000"))
+    # Pre-compressed variants written next to each extracted frame, e.g. "webp" or "webp,avif"
+    FRAME_VARIANTS: list = [v.strip() for v in os.getenv("FRAME_VARIANTS", "").split(",") if v.strip()]
+
 settings = Settings()
@@ -1,12 +1,50 @@
 import os
+import threading
 import cv2
 import numpy as np
 from ultralytics import YOLO
+from config import settings
+from core.inference_backends import export_weights, inference_threads, tune_threads
+
+def model_device(model):
+    """Torch device an Ultralytics model is on ("cpu", "cuda:0"), None if unknown (e.g. ONNX)."""
+    try:
+        return str(next(model.model.parameters()).device)
+    except Exception:
+        return None
+
+class DeviceInstances:
+    """
+    Copies of a model per torch device, created on first use.
+    Ultralytics places a model on a device once, at its first predict, so a call scheduled
+    on another device (see core/device_scheduler.py) needs its own instance.
+    """
+    def __init__(self, default, factory):
+        self.default = default
+        self.factory = factory
+        self.instances = {}
+        device = model_device(default)
+        if device:
+            self.instances[device] = default
+        self._lock = threading.Lock()
+
+    def get(self, device: str = None):
+        if device is None:
+            return self.default
+        with self._lock:
+            if device not in self.instances:
+                print(f"Loading a copy of the model on {device}")
+                self.instances[device] = self.factory()
+            return self.instances[device]
 
 class YOLOModel:
-    def __init__(self, weights_path: str):
+    task = "detect"
+
+    def __init__(self, weights_path: str, backend: str = None, int8: bool = None, threads: int = None):
         self.weights_path = weights_path
-        print(f"Initializing YOLOModel with weights: {weights_path}")
+        self.backend = backend or settings.INFERENCE_BACKEND
+        int8 = settings.INFERENCE_INT8 if int8 is None else int8
+        print(f"Initializing YOLOModel with weights: {weights_path} (backend={self.backend})")
         
         # Check if weights exist
         if not os.path.exists(weights_path):
@@ -16,12 +54,32 @@ class YOLOModel:
             else:
                 raise FileNotFoundError(f"Weights not found at {weights_path}")
         
+        # ONNX / OpenVINO export is cached next to the .pt, fall back to torch if it fails
+        self.model_path = self.weights_path
+        if self.backend != "torch":
+            try:
+                self.model_path = export_weights(self.weights_path, self.backend, int8=int8, task=self.task)
+            except Exception as e:
+                print(f"Export to {self.backend} failed, using torch: {e}")
+                self.backend = "torch"
+
         try:
-            self.model = YOLO(self.weights_path)
+            self.model = YOLO(self.model_path, task=self.task)
         except Exception as e:
             print(f"Error loading YOLO model: {e}")
             raise
 
+        # Warmup creates the backend session, then apply the thread count to it
+        self.model.predict(np.zeros((64, 64, 3), dtype=np.uint8), verbose=False)
+        tune_threads(self.model, self.backend, threads or inference_threads(), self.model_path)
+        self.devices = DeviceInstances(self.model, lambda: YOLO(self.model_path, task=self.task))
+
+    def _on(self, device: str = None) -> tuple:
+        """(model, predict kwargs) for a torch device, exported backends always run where they were loaded."""
+        if device is None or self.backend != "torch":
+            return self.model, {}
+        return self.devices.get(device), {"device": device}
+
     def detect(self, image: np.ndarray):
         """
         Run detection on the image.
@@ -49,12 +107,48 @@ class YOLOModel:
                 
         return bboxes
 
+    def predict_boxes(self, image: np.ndarray, conf: float = 0.25, device: str = None):
+        """
+        Run detection on the image.
+        Returns a list of plain detections {"xyxy": [x1, y1, x2, y2], "conf": float}
+        so results can be sent between processes.
+        """
+        return self.predict_boxes_batch([image], conf=conf, device=device)[0]
+
+    def predict_boxes_batch(self, images: list, conf: float = 0.25, imgsz: int = None, device: str = None):
+        """
+        Run detection on a batch of images in one forward pass.
+        Returns one list of detections (see predict_boxes) per image.
+        """
+        if self.model is None:
+            return [[] for _ in images]
+
+        model, kwargs = self._on(device)
+        if imgsz:
+            kwargs["imgsz"] = imgsz
+        results = model.predict(images, conf=conf, verbose=False, **kwargs)
+
+        batch = []
+        for result in results:
+            detections = []
+            for box in result.boxes:
+                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                detections.append({
+                    "xyxy": [float(x1), float(y1), float(x2), float(y2)],
+                    "conf": float(box.conf[0])
+                })
+            batch.append(detections)
+
+        return batch
+
 class YOLOSegModel(YOLOModel):
-    def __init__(self, weights_path: str):
-        super().__init__(weights_path)
+    task = "segment"
+
+    def __init__(self, weights_path: str, backend: str = None, int8: bool = None, threads: int = None):
+        super().__init__(weights_path, backend=backend, int8=int8, threads=threads)
         print(f"Initializing YOLOSegModel with weights: {weights_path}")
 
-    def segment(self, image: np.ndarray):
+    def segment(self, image: np.ndarray, device: str = None):
         """
         Run segmentation on the image.
         Returns a binary mask (uint8, 0 or 255) of the segmented object.
@@ -63,7 +157,8 @@ class YOLOSegModel(YOLOModel):
         if self.model is None:
             return None
             
-        results = self.model(image, verbose=False)
+        model, kwargs = self._on(device)
+        results = model(image, verbose=False, **kwargs)
         
         if not results or not results[0].masks:
             return None
@@ -105,11 +200,12 @@ class SAM2Model:
         try:
             from ultralytics import SAM
             self.model = SAM(self.weights_path)
+            self.devices = DeviceInstances(self.model, lambda: SAM(self.weights_path))
         except Exception as e:
             print(f"Error loading SAM model: {e}")
             self.model = None
     
-    def segment(self, image: np.ndarray, bbox: list):
+    def segment(self, image: np.ndarray, bbox: list, device: str = None):
         """
         Run segmentation on the image within the bbox using SAM.
         bbox: [x, y, w, h]
@@ -127,7 +223,10 @@ class SAM2Model:
         # Note: Ultralytics SAM implementation might vary. 
         # Standard usage: model(source, bboxes=[...])
         try:
-            results = self.model(image, bboxes=[[x, y, x2, y2]], verbose=False)
+            if device is None:
+                results = self.model(image, bboxes=[[x, y, x2, y2]], verbose=False)
+            else:
+                results = self.devices.get(device)(image, bboxes=[[x, y, x2, y2]], verbose=False, device=device)
             
             if not results or not results[0].masks:
                 return None
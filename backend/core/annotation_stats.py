@@ -0,0 +1,267 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from api.state import open_sqlite
+from config import settings
+from core.video_processing import read_frame_index, FRAME_INDEX_FILENAME
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS annotation_files (
+    video_name TEXT NOT NULL,
+    label TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    frame_index INTEGER NOT NULL,
+    PRIMARY KEY (video_name, label, filename)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS annotation_counts (
+    video_name TEXT NOT NULL,
+    label TEXT NOT NULL,
+    frame_index INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (video_name, label, frame_index)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS video_frames (
+    video_name TEXT PRIMARY KEY,
+    frames INTEGER NOT NULL,
+    index_mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# <VideoName>_frame<Index>_bbox<x>_<y>_<w>_<h>_<uid>.jpg (see /save)
+FRAME_PATTERN = re.compile(r"_frame(\d+)_bbox")
+
+def parse_frame_index(filename: str):
+    match = FRAME_PATTERN.search(filename)
+    return int(match.group(1)) if match else None
+
+class AnnotationStats:
+    """
+    Aggregated annotation counts per (video, label, frame index).
+    - annotation_files has one row per saved crop, so updates are idempotent
+      (saving over an existing crop or deleting twice does not skew the counts).
+    - annotation_counts is kept in step with it and is what the stats queries read.
+    /save and /delete_annotations update both incrementally. The annotation directory stays the
+    source of truth, rebuild() re-derives everything from it in one parallel scan.
+    """
+    def __init__(self, db_path: str, annotation_dir: str, scan_workers: int = 8):
+        self.db_path = db_path
+        self.annotation_dir = annotation_dir
+        self.scan_workers = scan_workers
+        self._local = threading.local()
+        self._rebuild_lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = open_sqlite(self.db_path)
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def add(self, video_name: str, label: str, filename: str, frame_index: int):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO annotation_files (video_name, label, filename, frame_index) VALUES (?, ?, ?, ?)",
+                (video_name, label, filename, frame_index),
+            )
+            if cur.rowcount:
+                conn.execute(
+                    "INSERT INTO annotation_counts (video_name, label, frame_index, count) VALUES (?, ?, ?, 1) "
+                    "ON CONFLICT (video_name, label, frame_index) DO UPDATE SET count = count + 1",
+                    (video_name, label, frame_index),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def remove(self, video_name: str, label: str, filename: str):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT frame_index FROM annotation_files WHERE video_name = ? AND label = ? AND filename = ?",
+                (video_name, label, filename),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "DELETE FROM annotation_files WHERE video_name = ? AND label = ? AND filename = ?",
+                    (video_name, label, filename),
+                )
+                conn.execute(
+                    "UPDATE annotation_counts SET count = count - 1 WHERE video_name = ? AND label = ? AND frame_index = ?",
+                    (video_name, label, row[0]),
+                )
+                conn.execute("DELETE FROM annotation_counts WHERE count <= 0")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _scan_video(self, video_name: str) -> list:
+        """(video_name, label, filename, frame_index) of every annotation jpg of one video."""
+        rows = []
+        video_dir = os.path.join(self.annotation_dir, video_name)
+        try:
+            labels = [e for e in os.scandir(video_dir) if e.is_dir()]
+        except OSError:
+            return rows
+        for label in labels:
+            for entry in os.scandir(label.path):
+                if not entry.name.lower().endswith(".jpg"):
+                    continue
+                frame_index = parse_frame_index(entry.name)
+                if frame_index is not None:
+                    rows.append((video_name, label.name, entry.name, frame_index))
+        return rows
+
+    def rebuild(self) -> dict:
+        """Replace all aggregates with a scan of the annotation directory, one thread per video."""
+        with self._rebuild_lock:
+            start = time.perf_counter()
+            videos = []
+            if os.path.exists(self.annotation_dir):
+                videos = [e.name for e in os.scandir(self.annotation_dir) if e.is_dir()]
+
+            # Directory listing is I/O bound (often a network mount), scan videos concurrently
+            with ThreadPoolExecutor(max_workers=self.scan_workers) as pool:
+                rows = [row for video_rows in pool.map(self._scan_video, videos) for row in video_rows]
+
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM annotation_files")
+                conn.execute("DELETE FROM annotation_counts")
+                conn.executemany(
+                    "INSERT OR IGNORE INTO annotation_files (video_name, label, filename, frame_index) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                conn.execute(
+                    "INSERT INTO annotation_counts (video_name, label, frame_index, count) "
+                    "SELECT video_name, label, frame_index, COUNT(*) FROM annotation_files "
+                    "GROUP BY video_name, label, frame_index"
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO stats_meta (key, value) VALUES ('built_at', ?)",
+                    (time.strftime("%Y-%m-%dT%H:%M:%S"),),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            elapsed = time.perf_counter() - start
+            print(f"Rebuilt annotation stats: {len(rows)} annotations in {len(videos)} videos ({elapsed:.2f}s)")
+            return {"videos": len(videos), "annotations": len(rows), "seconds": round(elapsed, 3)}
+
+    def ensure_built(self):
+        """Build the aggregates on first use (e.g. annotations saved before the stats existed)."""
+        row = self._connect().execute("SELECT value FROM stats_meta WHERE key = 'built_at'").fetchone()
+        if row is None:
+            self.rebuild()
+
+    def summary(self) -> dict:
+        """Annotation and annotated-frame counts per video and label."""
+        self.ensure_built()
+        conn = self._connect()
+        videos = {}
+        for video_name, label, annotations, frames in conn.execute(
+            "SELECT video_name, label, SUM(count), COUNT(*) FROM annotation_counts GROUP BY video_name, label"
+        ):
+            video = videos.setdefault(video_name, {"annotations": 0, "labels": {}})
+            video["annotations"] += annotations
+            video["labels"][label] = {"annotations": annotations, "frames": frames}
+        for video_name, frames in conn.execute(
+            "SELECT video_name, COUNT(DISTINCT frame_index) FROM annotation_counts GROUP BY video_name"
+        ):
+            videos[video_name]["annotated_frames"] = frames
+        built_at = conn.execute("SELECT value FROM stats_meta WHERE key = 'built_at'").fetchone()
+        return {"videos": videos, "built_at": built_at[0] if built_at else None}
+
+    def frame_counts(self, video_name: str) -> dict:
+        """frame_index -> {label: count} of one video."""
+        self.ensure_built()
+        frames = {}
+        for frame_index, label, count in self._connect().execute(
+            "SELECT frame_index, label, count FROM annotation_counts WHERE video_name = ? ORDER BY frame_index",
+            (video_name,),
+        ):
+            frames.setdefault(frame_index, {})[label] = count
+        return frames
+
+    def frame_totals(self, video_names: list, frame_cache_dir: str) -> dict:
+        """
+        video_name -> number of extracted frames (None if not extracted), for progress.
+        Counts are stored with the frame index's mtime, an index is only parsed again after it changed.
+        """
+        conn = self._connect()
+        stored = {name: (frames, mtime_ns) for name, frames, mtime_ns in conn.execute(
+            "SELECT video_name, frames, index_mtime_ns FROM video_frames"
+        )}
+        totals = {}
+        for video_name in video_names:
+            output_dir = os.path.join(frame_cache_dir, video_name)
+            try:
+                mtime_ns = os.stat(os.path.join(output_dir, FRAME_INDEX_FILENAME)).st_mtime_ns
+            except OSError:
+                totals[video_name] = None
+                continue
+            if video_name in stored and stored[video_name][1] == mtime_ns:
+                totals[video_name] = stored[video_name][0]
+                continue
+            try:
+                index = read_frame_index(output_dir)
+            except (OSError, ValueError):
+                totals[video_name] = None
+                continue
+            totals[video_name] = len(index["frames"]) if index else None
+            if index:
+                conn.execute(
+                    "INSERT OR REPLACE INTO video_frames (video_name, frames, index_mtime_ns) VALUES (?, ?, ?)",
+                    (video_name, totals[video_name], mtime_ns),
+                )
+        return totals
+
+def coverage_bins(frame_counts: dict, total_frames: int, bins: int, timestamps: list = None) -> list:
+    """
+    Split the frame list into `bins` equal ranges and report, per range, how many frames have
+    annotations and how many annotations there are (per label). For a heatmap along the timeline.
+    """
+    total_frames = max(total_frames, max(frame_counts, default=-1) + 1)
+    bins = max(1, min(bins, total_frames)) if total_frames else 0
+    result = []
+    for b in range(bins):
+        lo = b * total_frames // bins
+        hi = (b + 1) * total_frames // bins
+        entry = {"start_frame": lo, "end_frame": hi, "frames": hi - lo, "annotated_frames": 0, "annotations": 0, "labels": {}}
+        if timestamps and lo < len(timestamps):
+            entry["start_time"] = timestamps[lo]
+            entry["end_time"] = timestamps[min(hi, len(timestamps)) - 1]
+        result.append(entry)
+
+    for frame_index, labels in frame_counts.items():
+        entry = result[frame_index * bins // total_frames]
+        entry["annotated_frames"] += 1
+        for label, count in labels.items():
+            entry["annotations"] += count
+            entry["labels"][label] = entry["labels"].get(label, 0) + count
+
+    for entry in result:
+        entry["coverage"] = round(entry["annotated_frames"] / entry["frames"], 4) if entry["frames"] else 0.0
+    return result
+
+_stats = None
+
+def get_annotation_stats() -> AnnotationStats:
+    global _stats
+    if _stats is None:
+        _stats = AnnotationStats(settings.ANNOTATION_STATS_PATH, settings.ANNOTATION_DIR)
+    return _stats
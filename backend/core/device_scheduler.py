@@ -0,0 +1,239 @@
+import collections
+import contextlib
+import itertools
+import threading
+import time
+from config import settings
+from core.executors import ExecutorBusy
+from core.profiling import record_stage
+
+# All model calls of LocalModels go through one DeviceScheduler:
+# - each call leases a device slot plus an estimate of the model's memory on it
+# - waiting calls are granted in priority order: interactive (/process) before batch
+#   (fish gate during extraction, transcription), first come first served within a priority
+# - jobs that allow it run on the CPU when every accelerator is full instead of waiting
+# - batch jobs leave one slot of multi-slot devices free, so interactive calls always find room
+# Devices come from DEVICES (see parse_devices), accelerators can be simulated on the CPU.
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Rough device memory per running job (MB), used against each device's memory limit
+MODEL_MEMORY_MB = {
+    "yolo": 1000,
+    "yolo_seg": 1200,
+    "sam": 3000,
+    "whisper-tiny": 1000,
+    "whisper-base": 1000,
+    "whisper-small": 2000,
+    "whisper-medium": 5000,
+    "whisper-large": 10000,
+    "whisper-turbo": 6000,
+}
+
+class DeviceBusy(ExecutorBusy):
+    """Raised when no device could be leased within the timeout. Mapped to 503 in main.py."""
+    def __init__(self, message: str):
+        Exception.__init__(self, message)
+        self.name = "device"
+
+class Device:
+    def __init__(self, name: str, torch_device: str, memory_mb: int, slots: int):
+        self.name = name
+        self.torch_device = torch_device  # what the models are moved to ("cpu" for simulated devices)
+        self.memory_mb = memory_mb        # 0 = not limited
+        self.slots = slots
+        self.running = 0
+        self.memory_used = 0
+        self.completed = 0
+
+    @property
+    def accelerator(self) -> bool:
+        return self.name != "cpu"
+
+    def fits(self, memory_mb: int, reserve: int = 0) -> bool:
+        # reserve: slots kept free for higher priority jobs, only on devices with more slots than that
+        if self.running >= (self.slots - reserve if self.slots > reserve else self.slots):
+            return False
+        # A job larger than the device still runs, alone
+        if self.memory_mb <= 0 or self.running == 0:
+            return True
+        return self.memory_used + memory_mb <= self.memory_mb
+
+def parse_devices(spec: str) -> list:
+    """
+    "name[@torch_device]=memory_mb/slots,..." e.g. "cuda:0=24000/2,cpu=0/4".
+    A device named "cpu" is the fallback, any other is an accelerator. "gpu0@cpu=8000/1"
+    simulates an 8 GB single-slot accelerator that actually runs on the CPU.
+    """
+    devices = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, limits = item.rpartition("=")
+        if not name:
+            raise ValueError(f"Invalid device spec: {item}")
+        name, _, torch_device = name.partition("@")
+        memory_mb, _, slots = limits.partition("/")
+        devices.append(Device(name, torch_device or name, int(memory_mb or 0), int(slots or 1)))
+    if not any(not d.accelerator for d in devices):
+        raise ValueError(f"Device spec needs a cpu device: {spec}")
+    return devices
+
+def detect_devices() -> list:
+    """CUDA devices (90% of their memory, 2 slots each) plus the CPU."""
+    devices = []
+    try:
+        import torch
+        for i in range(torch.cuda.device_count()):
+            memory_mb = int(torch.cuda.get_device_properties(i).total_memory / (1024 * 1024) * 0.9)
+            devices.append(Device(f"cuda:{i}", f"cuda:{i}", memory_mb, 2))
+    except ImportError:
+        pass
+    devices.append(Device("cpu", "cpu", 0, settings.DEVICE_CPU_SLOTS))
+    return devices
+
+class DeviceScheduler:
+    def __init__(self, devices: list, timeout: float = 300.0, interactive_reserve: int = 1):
+        self.devices = devices
+        self.interactive_reserve = interactive_reserve
+        self.accelerators = [d for d in devices if d.accelerator]
+        self.cpu = next(d for d in devices if not d.accelerator)
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._waits = {p: collections.deque(maxlen=1000) for p in PRIORITY_NAMES}
+        self._granted = collections.Counter()
+        self._fallbacks = collections.Counter()
+        self._rejected = collections.Counter()
+
+    @contextlib.contextmanager
+    def lease(self, job: str, priority: int = INTERACTIVE, fallback: bool = True, timeout: float = None):
+        """
+        Wait for a device that has a free slot and room for the job, yield it and release it afterwards.
+        fallback: the job may run on the CPU when the accelerators are full.
+        """
+        entry = {
+            "job": job,
+            "priority": priority,
+            "seq": next(self._seq),
+            "memory": MODEL_MEMORY_MB.get(job, 1000),
+            "fallback": fallback,
+            "device": None,
+        }
+        start = time.perf_counter()
+        deadline = start + (self.timeout if timeout is None else timeout)
+        with self._cond:
+            self._waiting.append(entry)
+            self._waiting.sort(key=lambda e: (e["priority"], e["seq"]))
+            self._assign()
+            while entry["device"] is None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._waiting.remove(entry)
+                    self._rejected[job] += 1
+                    # This entry may have been blocking lower priorities
+                    self._assign()
+                    self._cond.notify_all()
+                    waited = self.timeout if timeout is None else timeout
+                    raise DeviceBusy(f"No device free for {job} within {waited:g}s, try again later")
+                self._cond.wait(remaining)
+            self._waiting.remove(entry)
+
+            device = entry["device"]
+            waited = time.perf_counter() - start
+            self._waits[priority].append(waited)
+            self._granted[job] += 1
+            if not device.accelerator and self.accelerators:
+                self._fallbacks[job] += 1
+        record_stage(f"device_wait:{device.name}", start)
+
+        try:
+            yield device
+        finally:
+            with self._cond:
+                device.running -= 1
+                device.memory_used -= entry["memory"]
+                device.completed += 1
+                self._assign()
+                self._cond.notify_all()
+
+    def _assign(self):
+        """
+        Hand free capacity to waiting jobs in priority order (caller holds the condition).
+        A job that does not fit blocks its devices for jobs of the same or lower priority,
+        so large jobs are not starved by a stream of small ones behind them.
+        """
+        blocked = {}
+        granted = False
+        for entry in self._waiting:
+            if entry["device"] is not None:
+                continue
+            preferred = self.accelerators or [self.cpu]
+            device = self._pick(preferred, entry, blocked)
+            if device is None and entry["fallback"] and self.accelerators:
+                device = self._pick([self.cpu], entry, blocked)
+            if device is None:
+                if entry["fallback"] and self.accelerators:
+                    preferred = preferred + [self.cpu]
+                for d in preferred:
+                    blocked[d.name] = min(blocked.get(d.name, entry["priority"]), entry["priority"])
+                continue
+            device.running += 1
+            device.memory_used += entry["memory"]
+            entry["device"] = device
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _pick(self, devices: list, entry: dict, blocked: dict):
+        reserve = self.interactive_reserve if entry["priority"] > INTERACTIVE else 0
+        # Least loaded first
+        for device in sorted(devices, key=lambda d: (d.running / d.slots, d.memory_used)):
+            if device.name in blocked and entry["priority"] >= blocked[device.name]:
+                continue
+            if device.fits(entry["memory"], reserve):
+                return device
+        return None
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued = collections.Counter(PRIORITY_NAMES[e["priority"]] for e in self._waiting if e["device"] is None)
+            waits = {}
+            for priority, values in self._waits.items():
+                values = sorted(values)
+                waits[PRIORITY_NAMES[priority]] = {
+                    "count": len(values),
+                    "p50_ms": round(values[len(values) // 2] * 1000, 2) if values else None,
+                    "p99_ms": round(values[min(len(values) - 1, int(len(values) * 0.99))] * 1000, 2) if values else None,
+                    "max_ms": round(values[-1] * 1000, 2) if values else None,
+                }
+            return {
+                "devices": [{
+                    "name": d.name,
+                    "torch_device": d.torch_device,
+                    "slots": d.slots,
+                    "running": d.running,
+                    "memory_mb": d.memory_mb,
+                    "memory_used_mb": d.memory_used,
+                    "completed": d.completed,
+                } for d in self.devices],
+                "queued": {name: queued.get(name, 0) for name in PRIORITY_NAMES.values()},
+                "waits": waits,
+                "granted": dict(self._granted),
+                "cpu_fallbacks": dict(self._fallbacks),
+                "rejected": dict(self._rejected),
+            }
+
+_scheduler = None
+
+def get_scheduler() -> DeviceScheduler:
+    global _scheduler
+    if _scheduler is None:
+        devices = parse_devices(settings.DEVICES) if settings.DEVICES else detect_devices()
+        print("Devices: " + ", ".join(f"{d.name} ({d.torch_device}, {d.memory_mb or '-'} MB, {d.slots} slots)" for d in devices))
+        _scheduler = DeviceScheduler(devices, timeout=settings.DEVICE_WAIT_TIMEOUT)
+    return _scheduler
@@ -0,0 +1,85 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+from core.profiling import trace_stage, record_stage
+
+class ExecutorBusy(Exception):
+    """Raised when an executor's queue is full. Mapped to 503 in main.py."""
+    def __init__(self, name: str):
+        super().__init__(f"{name} executor is busy, try again later")
+        self.name = name
+
+class BoundedExecutor:
+    """
+    Thread pool with a bounded queue.
+    Keeps heavy work (frame extraction, inference) off the event loop and away from
+    the threads that serve cheap requests, and rejects work instead of queueing forever.
+    """
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+
+    async def run(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) in the pool, raise ExecutorBusy if the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ExecutorBusy(self.name)
+
+        with self._lock:
+            self._in_flight += 1
+
+        # Run with the caller's context so contextvars set by middleware are visible
+        ctx = contextvars.copy_context()
+        future = self._pool.submit(functools.partial(ctx.run, self._traced, time.perf_counter(), func, *args, **kwargs))
+        # Release the slot when the work actually finishes, not when the client goes away
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _traced(self, submitted: float, func, *args, **kwargs):
+        # Queue wait and run time show up in the request trace (no-op outside traced requests)
+        record_stage(f"{self.name}_queue", submitted)
+        with trace_stage(f"{self.name}:{getattr(func, '__name__', 'call')}"):
+            return func(*args, **kwargs)
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = self._in_flight
+            rejected = self._rejected
+        return {
+            "workers": self.max_workers,
+            "running": min(in_flight, self.max_workers),
+            "queued": max(0, in_flight - self.max_workers),
+            "max_queue": self.max_queue,
+            "rejected": rejected,
+        }
+
+# Short file system reads/writes (annotations, listing, frame pages)
+io_executor = BoundedExecutor("io", settings.IO_WORKERS, settings.IO_QUEUE)
+# Long file system jobs (export, stats rebuild, transcript indexing) that must not fill the io pool
+bulk_executor = BoundedExecutor("bulk", settings.BULK_WORKERS, settings.BULK_QUEUE)
+# CPU-bound image/video work (frame extraction)
+cpu_executor = BoundedExecutor("cpu", settings.CPU_WORKERS, settings.CPU_QUEUE)
+# Interactive model inference (/process detection and segmentation)
+inference_executor = BoundedExecutor("inference", settings.INFERENCE_WORKERS, settings.INFERENCE_QUEUE)
+# Batch model work (transcription): minutes long, on its own threads so it cannot take every
+# inference thread, the device scheduler decides which model call runs first
+batch_executor = BoundedExecutor("batch", settings.BATCH_WORKERS, settings.BATCH_QUEUE)
+
+def executor_stats() -> dict:
+    return {e.name: e.stats() for e in (io_executor, bulk_executor, cpu_executor, inference_executor, batch_executor)}
@@ -0,0 +1,94 @@
+import os
+from config import settings
+
+# Exported models are cached next to the .pt file:
+#   weights/detect/all.pt -> all.onnx, all.int8.onnx, all_openvino_model/, all_int8_openvino_model/
+BACKENDS = ("torch", "onnx", "openvino")
+
+def exported_path(weights_path: str, backend: str, int8: bool = False) -> str:
+    base = os.path.splitext(weights_path)[0]
+    if backend == "onnx":
+        return f"{base}.int8.onnx" if int8 else f"{base}.onnx"
+    if backend == "openvino":
+        return f"{base}_int8_openvino_model" if int8 else f"{base}_openvino_model"
+    return weights_path
+
+def _is_fresh(path: str, weights_path: str) -> bool:
+    """Export exists and is newer than the .pt it was made from."""
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(weights_path)
+
+def export_weights(weights_path: str, backend: str, int8: bool = False, task: str = "detect") -> str:
+    """
+    Export .pt weights to ONNX / OpenVINO once and return the path of the cached export.
+    ONNX INT8 uses dynamic (weight-only) quantization, which needs no calibration data.
+    OpenVINO INT8 needs a calibration dataset (INFERENCE_INT8_DATA, an Ultralytics dataset yaml).
+    """
+    if backend == "torch":
+        return weights_path
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    target = exported_path(weights_path, backend, int8)
+    if _is_fresh(target, weights_path):
+        return target
+
+    from ultralytics import YOLO
+    print(f"Exporting {weights_path} to {backend}{' (int8)' if int8 else ''}...")
+    model = YOLO(weights_path, task=task)
+
+    if backend == "onnx":
+        # dynamic axes so batched gating and other image sizes work with the same file
+        fp32_path = exported_path(weights_path, "onnx")
+        if not _is_fresh(fp32_path, weights_path):
+            fp32_path = model.export(format="onnx", dynamic=True, simplify=True)
+        if int8:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(fp32_path, target, weight_type=QuantType.QUInt8)
+        return target
+
+    # OpenVINO
+    if int8 and not settings.INFERENCE_INT8_DATA:
+        raise ValueError("OpenVINO INT8 export needs a calibration dataset, set INFERENCE_INT8_DATA")
+    kwargs = {"int8": True, "data": settings.INFERENCE_INT8_DATA} if int8 else {}
+    path = model.export(format="openvino", dynamic=True, **kwargs)
+    return str(path)
+
+def inference_threads() -> int:
+    return settings.INFERENCE_THREADS or max(1, (os.cpu_count() or 2) // 2)
+
+def tune_threads(yolo, backend: str, threads: int, model_path: str):
+    """
+    Apply the intra-op thread count to a loaded Ultralytics model.
+    Ultralytics creates the ONNX Runtime session / OpenVINO compiled model with default settings,
+    so after a warmup predict we replace them with ones using our thread count.
+    """
+    if backend == "torch":
+        # Keep PyTorch's default unless configured, the thread pool is shared with SAM / Whisper
+        if settings.INFERENCE_THREADS:
+            import torch
+            torch.set_num_threads(threads)
+        return
+
+    backend_model = getattr(getattr(yolo, "predictor", None), "model", None)
+    try:
+        if backend == "onnx" and hasattr(backend_model, "session"):
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            backend_model.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        elif backend == "openvino" and hasattr(backend_model, "ov_compiled_model"):
+            import glob
+            import openvino as ov
+            core = ov.Core()
+            xml_path = glob.glob(os.path.join(model_path, "*.xml"))[0]
+            backend_model.ov_compiled_model = core.compile_model(
+                core.read_model(xml_path),
+                device_name="CPU",
+                config={"INFERENCE_NUM_THREADS": threads, "PERFORMANCE_HINT": "LATENCY"},
+            )
+        else:
+            print(f"Warning: could not tune {backend} threads (unexpected Ultralytics backend layout)")
+    except Exception as e:
+        print(f"Warning: could not tune {backend} threads: {e}")
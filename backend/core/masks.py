@@ -0,0 +1,109 @@
+import json
+import os
+import cv2
+import numpy as np
+
+# Segmentation masks are kept as data next to the (unmasked) crop instead of being burned into the JPEG:
+#   mask:      COCO-style compressed RLE of the fish crop, "origin" = its top-left in frame coordinates
+#   polygons:  outer contours in frame coordinates, largest first
+#   letterbox: how the fish crop was placed on the 640x640 crop image (for applying the mask later)
+
+def _counts_to_string(counts: list) -> str:
+    """COCO's compressed counts: deltas to the run two back, 5 bits per character with a continuation bit."""
+    chars = []
+    for i, x in enumerate(counts):
+        if i > 2:
+            x -= counts[i - 2]
+        more = True
+        while more:
+            c = x & 0x1f
+            x >>= 5
+            more = x != -1 if c & 0x10 else x != 0
+            if more:
+                c |= 0x20
+            chars.append(chr(c + 48))
+    return "".join(chars)
+
+def _string_to_counts(s: str) -> list:
+    counts = []
+    p = 0
+    while p < len(s):
+        x = k = 0
+        more = True
+        while more:
+            c = ord(s[p]) - 48
+            x |= (c & 0x1f) << (5 * k)
+            more = c & 0x20
+            p += 1
+            k += 1
+            if not more and c & 0x10:
+                x |= -1 << (5 * k)
+        if len(counts) > 2:
+            x += counts[-2]
+        counts.append(x)
+    return counts
+
+def encode_rle(mask: np.ndarray, origin: list = None) -> dict:
+    """Run-length encode a binary mask (column-major, counts start with a run of zeros, compressed as in COCO)."""
+    h, w = mask.shape[:2]
+    flat = (mask.reshape(-1, order="F") > 0).astype(np.uint8)
+    changes = np.flatnonzero(np.diff(flat)) + 1
+    counts = np.diff(np.concatenate([[0], changes, [flat.size]])).tolist()
+    if flat.size and flat[0] == 1:
+        counts = [0] + counts
+    return {"format": "rle", "origin": list(origin or [0, 0]), "size": [h, w], "counts": _counts_to_string(counts)}
+
+def decode_rle(rle: dict) -> np.ndarray:
+    """Decode encode_rle output back to a uint8 mask (0 or 255). Also reads uncompressed (list) counts."""
+    h, w = rle["size"]
+    counts = rle["counts"]
+    if isinstance(counts, str):
+        counts = _string_to_counts(counts)
+    counts = np.asarray(counts, dtype=np.int64)
+    values = np.zeros(len(counts), dtype=np.uint8)
+    values[1::2] = 255
+    return np.repeat(values, counts).reshape((h, w), order="F")
+
+def mask_to_polygons(mask: np.ndarray, origin: list = None, epsilon: float = 1.0) -> list:
+    """Outer contours of the mask as [[x, y], ...] polygons in frame coordinates, largest first."""
+    ox, oy = origin or [0, 0]
+    contours = cv2.findContours((mask > 0).astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+    contours = sorted(contours, key=cv2.contourArea, reverse=True)
+
+    polygons = []
+    for contour in contours:
+        approx = cv2.approxPolyDP(contour, epsilon, True).reshape(-1, 2)
+        if len(approx) < 3:
+            continue
+        polygons.append([[int(x) + ox, int(y) + oy] for x, y in approx])
+    return polygons
+
+def apply_mask_to_crop(crop_image: np.ndarray, mask_rle: dict, letterbox: dict) -> np.ndarray:
+    """Black out the background of a saved letterboxed crop (what auto segmentation used to bake in)."""
+    mask = decode_rle(mask_rle)
+    new_w, new_h = letterbox["resized"]
+    x_offset, y_offset = letterbox["offset"]
+    resized = cv2.resize(mask, (new_w, new_h), interpolation=cv2.INTER_NEAREST)
+
+    full = np.zeros(crop_image.shape[:2], dtype=np.uint8)
+    full[y_offset:y_offset + new_h, x_offset:x_offset + new_w] = resized
+    return cv2.bitwise_and(crop_image, crop_image, mask=full)
+
+def sidecar_path(image_path: str) -> str:
+    """Path of the mask JSON saved next to an annotation image."""
+    return os.path.splitext(image_path)[0] + ".json"
+
+def write_sidecar(image_path: str, data: dict):
+    with open(sidecar_path(image_path), 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+def read_sidecar(image_path: str):
+    path = sidecar_path(image_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading mask sidecar {path}: {e}")
+        return None
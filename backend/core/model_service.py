@@ -0,0 +1,249 @@
+import os
+import stat
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from config import settings
+from core.profiling import trace_stage
+from core.device_scheduler import get_scheduler, DeviceBusy, INTERACTIVE, BATCH
+
+class LocalModels:
+    """
+    Models loaded in the current process.
+    Used directly in single-worker mode and by model_server.py in multi-worker mode.
+    Every call leases a device from the device scheduler: /process calls (detect, segment) are
+    interactive, fish gating and transcription are batch work.
+    """
+    def __init__(self):
+        from core.ai_models import YOLOModel, YOLOSegModel, SAM2Model
+
+        self.yolo_model = None
+        self.yolo_seg_model = None
+        self.sam_model = None
+
+        self.scheduler = get_scheduler()
+        # Ultralytics models are not thread-safe, serialize calls per model instance (model, device)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+        try:
+            print(f"Loading YOLO model from {settings.YOLO_MODEL_PATH}...")
+            self.yolo_model = YOLOModel(settings.YOLO_MODEL_PATH)
+            print("YOLO model loaded.")
+        except Exception as e:
+            print(f"Failed to initialize YOLO model: {e}")
+
+        try:
+            print(f"Loading YOLO Seg model from {settings.YOLO_SEG_MODEL_PATH}...")
+            self.yolo_seg_model = YOLOSegModel(settings.YOLO_SEG_MODEL_PATH)
+            print("YOLO Seg model loaded.")
+        except Exception as e:
+            print(f"Failed to initialize YOLO Seg model: {e}")
+
+        try:
+            print(f"Loading SAM model from {settings.SAM2_MODEL_PATH}...")
+            self.sam_model = SAM2Model(settings.SAM2_MODEL_PATH)
+            print("SAM model loaded.")
+        except Exception as e:
+            print(f"Failed to initialize SAM model: {e}")
+
+    def status(self) -> dict:
+        return {
+            "yolo": self.yolo_model is not None,
+            "yolo_seg": self.yolo_seg_model is not None,
+            "sam": self.sam_model is not None,
+        }
+
+    def _lock(self, model: str, device=None) -> threading.Lock:
+        key = (model, device.name if device else None)
+        with self._locks_lock:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def device_stats(self) -> dict:
+        return self.scheduler.stats()
+
+    def detect(self, image, conf: float = 0.25) -> list:
+        """Return detections [{"xyxy": [...], "conf": float}] for the image."""
+        if self.yolo_model is None:
+            raise RuntimeError("AI model not initialized")
+        with self.scheduler.lease("yolo", INTERACTIVE) as device, self._lock("yolo", device):
+            return self.yolo_model.predict_boxes(image, conf=conf, device=device.torch_device)
+
+    def detect_batch(self, images: list, conf: float = 0.25, imgsz: int = None) -> list:
+        """Return one list of detections per image, in a single batched forward pass."""
+        if self.yolo_model is None:
+            raise RuntimeError("AI model not initialized")
+        with self.scheduler.lease("yolo", BATCH) as device, self._lock("yolo", device):
+            return self.yolo_model.predict_boxes_batch(images, conf=conf, imgsz=imgsz, device=device.torch_device)
+
+    def segment(self, image, seg_model: str = "YOLO", bbox: list = None):
+        """Return a binary mask (0 or 255) for the image, or None if unavailable."""
+        if seg_model == "YOLO" and self.yolo_seg_model:
+            with self.scheduler.lease("yolo_seg", INTERACTIVE) as device, self._lock("yolo_seg", device):
+                return self.yolo_seg_model.segment(image, device=device.torch_device)
+        if seg_model == "SAM" and self.sam_model:
+            with self.scheduler.lease("sam", INTERACTIVE) as device, self._lock("sam", device):
+                return self.sam_model.segment(image, bbox, device=device.torch_device)
+        return None
+
+    def transcribe(self, video_path: str, video_name: str, model_name: str = "large", force: bool = False) -> list:
+        from core.transcription import transcribe_video, cached_transcription
+        if not force:
+            # Reading a saved transcription needs no device
+            segments = cached_transcription(video_name)
+            if segments is not None:
+                return segments
+        # Whisper large is far too slow on the CPU to be worth a fallback, it waits for its device.
+        # One Whisper model is loaded at a time, so calls are serialized regardless of the device.
+        with self.scheduler.lease(f"whisper-{model_name}", BATCH, fallback=False) as device, self._lock("whisper"):
+            return transcribe_video(video_path, video_name, model_name=model_name, force=force, device=device.torch_device)
+
+class RemoteModels:
+    """
+    Client for the model server (model_server.py).
+    Has the same interface as LocalModels, calls are forwarded over a local socket.
+    """
+    def __init__(self, address: str, authkey: str, connect_timeout: float = 60.0, timeout: float = 600.0):
+        if not authkey:
+            raise RuntimeError("MODEL_SERVER_AUTHKEY must be set to the model server's key")
+        self.address = address
+        self.authkey = authkey.encode()
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        # The model server may still be loading weights when workers start
+        deadline = time.time() + self.connect_timeout
+        while True:
+            try:
+                conn = Client(self.address, authkey=self.authkey)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.time() > deadline:
+                    raise RuntimeError(f"Model server not reachable at {self.address}")
+                time.sleep(0.5)
+
+        self._local.conn = conn
+        return conn
+
+    def _call(self, method: str, *args, timeout: float = None, **kwargs):
+        with trace_stage(f"model_server:{method}"):
+            return self._call_server(method, *args, timeout=timeout, **kwargs)
+
+    def _call_server(self, method: str, *args, timeout: float = None, **kwargs):
+        conn = self._connection()
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            conn.send((method, args, kwargs))
+            if not conn.poll(timeout):
+                # The answer may still come, this connection is out of step: close it, reconnect next call
+                self._local.conn = None
+                conn.close()
+                raise RuntimeError(f"Model server did not answer {method} within {timeout:g}s")
+            status, result = conn.recv()
+        except (EOFError, OSError):
+            # Server restarted, drop the connection so the next call reconnects
+            self._local.conn = None
+            raise RuntimeError("Lost connection to model server")
+
+        if status == "busy":
+            raise DeviceBusy(result)
+        if status == "error":
+            raise RuntimeError(result)
+        return result
+
+    def status(self) -> dict:
+        return self._call("status")
+
+    def device_stats(self) -> dict:
+        return self._call("device_stats")
+
+    def detect(self, image, conf: float = 0.25) -> list:
+        return self._call("detect", image, conf=conf)
+
+    def detect_batch(self, images: list, conf: float = 0.25, imgsz: int = None) -> list:
+        return self._call("detect_batch", images, conf=conf, imgsz=imgsz)
+
+    def segment(self, image, seg_model: str = "YOLO", bbox: list = None):
+        return self._call("segment", image, seg_model=seg_model, bbox=bbox)
+
+    def transcribe(self, video_path: str, video_name: str, model_name: str = "large", force: bool = False) -> list:
+        return self._call("transcribe", video_path, video_name, model_name=model_name, force=force,
+                          timeout=settings.MODEL_SERVER_TRANSCRIBE_TIMEOUT)
+
+# Methods of LocalModels that clients may call through the model server
+SERVED_METHODS = {"status", "device_stats", "detect", "detect_batch", "segment", "transcribe"}
+
+def _handle_connection(conn, models: LocalModels):
+    with conn:
+        while True:
+            try:
+                method, args, kwargs = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            if method not in SERVED_METHODS:
+                conn.send(("error", f"Unknown method: {method}"))
+                continue
+
+            try:
+                result = getattr(models, method)(*args, **kwargs)
+                conn.send(("ok", result))
+            except DeviceBusy as e:
+                # Passed on as such so that API workers answer 503 instead of 500
+                conn.send(("busy", str(e)))
+            except Exception as e:
+                print(f"Model server error in {method}: {e}")
+                conn.send(("error", str(e)))
+
+def default_model_server_address() -> str:
+    """Socket path in a per-user directory, used when MODEL_SERVER_ADDRESS is not set."""
+    return os.path.join(tempfile.gettempdir(), f"fish_annotation-{os.getuid()}", "models.sock")
+
+def _private_socket_dir(address: str):
+    """Create the socket's directory 0700, refuse one that other users can get into."""
+    socket_dir = os.path.dirname(os.path.abspath(address))
+    os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+    info = os.stat(socket_dir)
+    if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+        raise RuntimeError(f"Model server socket directory {socket_dir} must be owned by this user and mode 0700")
+
+def serve_models(address: str, authkey: str):
+    """Load models once and serve them to API workers over a local socket."""
+    if not authkey:
+        raise RuntimeError("MODEL_SERVER_AUTHKEY must be set (start_server.sh generates one per launch)")
+    _private_socket_dir(address)
+    models = LocalModels()
+
+    if os.path.exists(address):
+        # Stale socket from a previous run
+        os.remove(address)
+
+    with Listener(address, authkey=authkey.encode()) as listener:
+        os.chmod(address, 0o600)
+        print(f"Model server listening on {address}")
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_handle_connection, args=(conn, models), daemon=True).start()
+
+_models = None
+
+def get_models():
+    """Return the models for this process: local models, or a client for the model server."""
+    global _models
+    if _models is None:
+        if settings.MODEL_SERVER_ADDRESS:
+            print(f"Using model server at {settings.MODEL_SERVER_ADDRESS}")
+            _models = RemoteModels(settings.MODEL_SERVER_ADDRESS, settings.MODEL_SERVER_AUTHKEY,
+                                   timeout=settings.MODEL_SERVER_TIMEOUT)
+        else:
+            _models = LocalModels()
+    return _models
@@ -0,0 +1,157 @@
+import collections
+import contextlib
+import contextvars
+import os
+import sys
+import threading
+import time
+
+# Two profiling tools that cost (almost) nothing while unused:
+# - per-request traces: SlowRequestMiddleware gives each API request a RequestTrace in a contextvar,
+#   code marks stages with `with trace_stage("detect"):`. The executors run work in a copy of the
+#   caller's context, so stages in pool threads land in the same trace. Requests slower than
+#   SLOW_REQUEST_MS are logged with their stages. Without a trace, trace_stage is a contextvar lookup.
+# - sample_stacks(): a sampling profiler over sys._current_frames(), run on demand from /admin/profile,
+#   returning folded stacks ("a;b;c 12" lines) for flamegraph.pl / speedscope.
+
+class RequestTrace:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        self.stages = []
+
+    def add(self, name: str, start: float, end: float):
+        # list.append is atomic, stages may come from several pool threads
+        self.stages.append({
+            "stage": name,
+            "start_ms": round((start - self.start) * 1000, 2),
+            "ms": round((end - start) * 1000, 2),
+            "thread": threading.current_thread().name,
+        })
+
+_current_trace = contextvars.ContextVar("request_trace", default=None)
+
+@contextlib.contextmanager
+def trace_stage(name: str):
+    """Record the duration of the enclosed block in the current request's trace, if any."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, start, time.perf_counter())
+
+def record_stage(name: str, start: float, end: float = None):
+    """Record a stage measured elsewhere (e.g. time spent waiting in an executor queue)."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, start, time.perf_counter() if end is None else end)
+
+def detached(func, *args, **kwargs):
+    """
+    Call func in an empty context, e.g. detached(asyncio.create_task, coro) for background work
+    that outlives the request: its stages must not keep landing in a trace that was already logged.
+    """
+    return contextvars.Context().run(func, *args, **kwargs)
+
+# Most recent slow requests of this process, for /admin/slow_requests
+slow_requests = collections.deque(maxlen=100)
+
+class SlowRequestMiddleware:
+    """
+    ASGI middleware that traces API requests and logs the ones slower than `threshold_ms`.
+    Only installed when SLOW_REQUEST_MS > 0 (see main.py). Static files and admin endpoints
+    (a profile run is slow by design) are not traced.
+    """
+    def __init__(self, app, threshold_ms: float, prefix: str = "/api", exclude: tuple = ("/api/admin",)):
+        self.app = app
+        self.threshold = threshold_ms / 1000
+        self.prefix = prefix
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix) or scope["path"].startswith(self.exclude):
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope["method"], scope["path"])
+        token = _current_trace.set(trace)
+        status = [None]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            elapsed = time.perf_counter() - trace.start
+            if elapsed >= self.threshold:
+                self._log(trace, scope, status[0], elapsed)
+
+    def _log(self, trace: RequestTrace, scope, status, elapsed: float):
+        query = scope.get("query_string", b"").decode("latin-1")
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "pid": os.getpid(),
+            "method": trace.method,
+            "path": trace.path,
+            "query": query,
+            "status": status,
+            "ms": round(elapsed * 1000, 2),
+            "stages": trace.stages,
+        }
+        slow_requests.append(entry)
+        stages = ", ".join(f"{s['stage']} {s['ms']:.0f}ms" for s in trace.stages)
+        print(f"Slow request: {trace.method} {trace.path} {entry['ms']:.0f} ms (status {status}) [{stages}]")
+
+# Leaf frames of threads that are just waiting for work, left out unless idle=True
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("connection.py", "accept"),
+}
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def sample_stacks(seconds: float, interval: float = 0.005, idle: bool = False) -> dict:
+    """
+    Sample the Python stacks of all threads every `interval` seconds for `seconds`.
+    Returns {"folded": {stack: count}, "samples": n, ...}, stacks are "thread;outer;...;inner".
+    """
+    me = threading.get_ident()
+    counts = collections.Counter()
+    samples = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            code = frame.f_code
+            if not idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            counts[";".join(reversed(stack))] += 1
+        samples += 1
+        time.sleep(interval)
+
+    return {"folded": dict(counts), "samples": samples, "seconds": seconds, "interval": interval}
+
+def folded_text(folded: dict) -> str:
+    """Collapsed-stack text, one "stack count" line per stack, as flamegraph.pl expects."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(folded.items()))
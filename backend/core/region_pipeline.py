@@ -0,0 +1,240 @@
+import contextlib
+import struct
+import threading
+import time
+import cv2
+import numpy as np
+from config import settings
+from core.executors import ExecutorBusy
+from core.profiling import trace_stage, record_stage
+
+# Memory-bounded image handling for /process:
+# - the selected region is decoded at reduced resolution (libjpeg DCT scaling) when it is large
+#   compared to the model / crop size, a 4K frame is only decoded at full resolution when a small
+#   fish needs the detail, and only the region is kept of it. cv2 has no region-of-interest decode,
+#   so that full decode still costs the whole frame for as long as the region is copied out
+# - crops are letterboxed into per-request canvas buffers instead of new arrays per fish
+# - every decode reserves its size from a process-wide MemoryBudget, requests wait for room
+
+TARGET_SIZE = 640
+# cv2.imread flags for decoding at 1/factor resolution
+REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+class MemoryBudgetExceeded(ExecutorBusy):
+    """Raised when a reservation does not fit into the memory budget in time. Mapped to 503 in main.py."""
+    def __init__(self, name: str, nbytes: int):
+        Exception.__init__(self, f"{name} memory budget is full ({nbytes / (1024 * 1024):.1f} MB requested), try again later")
+        self.name = name
+
+class Reservation:
+    """Bytes held in a MemoryBudget, shrink() gives back what is no longer needed."""
+    def __init__(self, budget, nbytes: int):
+        self.budget = budget
+        self.nbytes = nbytes
+
+    def shrink(self, nbytes: int):
+        nbytes = max(0, min(int(nbytes), self.nbytes))
+        with self.budget._cond:
+            self.budget._used -= self.nbytes - nbytes
+            self.budget._cond.notify_all()
+        self.nbytes = nbytes
+
+class MemoryBudget:
+    """
+    Process-wide budget of bytes for decoded images.
+    reserve() blocks until the bytes fit (up to `timeout` seconds), so the image memory of concurrent
+    requests stays below `limit` however many of them arrive. A single reservation larger than the
+    whole budget is clamped to it and runs alone.
+    """
+    def __init__(self, name: str, limit: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.timeout = timeout
+        self._used = 0
+        self._peak = 0
+        self._waiting = 0
+        self._rejected = 0
+        self._cond = threading.Condition()
+
+    @contextlib.contextmanager
+    def reserve(self, nbytes: int):
+        nbytes = min(int(nbytes), self.limit)
+        deadline = time.monotonic() + self.timeout
+        waited = None
+        with self._cond:
+            self._waiting += 1
+            try:
+                while self._used + nbytes > self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._rejected += 1
+                        raise MemoryBudgetExceeded(self.name, nbytes)
+                    waited = waited or time.perf_counter()
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+                if waited is not None:
+                    record_stage(f"{self.name}_memory_wait", waited)
+            self._used += nbytes
+            self._peak = max(self._peak, self._used)
+        reservation = Reservation(self, nbytes)
+        try:
+            yield reservation
+        finally:
+            with self._cond:
+                self._used -= reservation.nbytes
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "used": self._used,
+                "peak": self._peak,
+                "waiting": self._waiting,
+                "rejected": self._rejected,
+            }
+
+region_budget = MemoryBudget("region", settings.REGION_MEMORY_BUDGET_MB * 1024 * 1024, settings.REGION_MEMORY_TIMEOUT)
+
+def jpeg_size(path: str):
+    """(width, height) from the JPEG frame header without decoding, None if not a JPEG."""
+    with open(path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return None
+        while True:
+            byte = f.read(1)
+            while byte and byte != b'\xff':
+                byte = f.read(1)
+            while byte == b'\xff':
+                byte = f.read(1)
+            if not byte:
+                return None
+            marker = byte[0]
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                # Markers without a length
+                continue
+            length = struct.unpack('>H', f.read(2))[0]
+            # SOF0-SOF15 except DHT / JPG / DAC
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                _, height, width = struct.unpack('>BHH', f.read(5))
+                return width, height
+            f.seek(length - 2, 1)
+
+def reduction_factor(region_size: float, target_size: int = TARGET_SIZE) -> int:
+    """Largest JPEG decode reduction that still leaves `target_size` pixels across the region."""
+    if not settings.REGION_REDUCED_DECODE:
+        return 1
+    for factor in (8, 4, 2):
+        if region_size / factor >= target_size:
+            return factor
+    return 1
+
+class RegionSource:
+    """
+    Pixels of one region of a frame, decoded as little as possible.
+    Coordinates passed in and returned are in full-resolution region coordinates.
+    Use as a context manager, budget reservations are released on exit.
+    """
+    def __init__(self, path: str, budget: MemoryBudget = None):
+        self.path = path
+        self.budget = budget or region_budget
+        self._stack = contextlib.ExitStack()
+        self._images = {}  # factor -> region decoded at 1/factor
+        self._held = 0  # bytes of the decoded regions reserved until exit
+        self.frame_size = None
+        try:
+            self.frame_size = jpeg_size(path)
+        except (OSError, struct.error):
+            pass
+        self.region = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._images.clear()
+        self._stack.close()
+
+    def set_region(self, x: int, y: int, w: int, h: int):
+        self.region = (x, y, w, h)
+
+    def _decode(self, factor: int):
+        """Decode the frame at 1/factor and keep only the region of it."""
+        if factor in self._images:
+            return self._images[factor]
+
+        x, y, w, h = self.region
+        frame_w, frame_h = self.frame_size
+        decoded_bytes = -(-frame_w // factor) * -(-frame_h // factor) * 3
+        region_bytes = -(-w // factor) * -(-h // factor) * 3
+        # One reservation for the decoded frame plus the region copied out of it, shrunk to the region
+        # once the frame is freed. Clamped to what the budget has beside this request's earlier regions,
+        # so an oversized frame runs alone instead of waiting for room it can never get.
+        nbytes = min(decoded_bytes + region_bytes, max(0, self.budget.limit - self._held))
+        reservation = self._stack.enter_context(self.budget.reserve(nbytes))
+        with trace_stage(f"decode_1/{factor}"):
+            image = cv2.imread(self.path, REDUCED_FLAGS[factor]) if factor > 1 else cv2.imread(self.path)
+        if image is None:
+            raise ValueError(f"Failed to read image: {self.path}")
+        # Use the decoder's actual scale, it rounds up odd sizes
+        sx = image.shape[1] / frame_w
+        sy = image.shape[0] / frame_h
+        region = image[int(y * sy):int((y + h) * sy), int(x * sx):int((x + w) * sx)].copy()
+        del image
+        reservation.shrink(region_bytes)
+        self._held += reservation.nbytes
+
+        self._images[factor] = (region, sx, sy)
+        return self._images[factor]
+
+    def detection_image(self):
+        """Region image for the detector and its x / y scale (image pixels per region pixel)."""
+        _, _, w, h = self.region
+        return self._decode(reduction_factor(max(w, h)))
+
+    def crop(self, cx: int, cy: int, cw: int, ch: int):
+        """
+        Crop of the region with at least TARGET_SIZE pixels across where the frame has them.
+        Large fish come from the reduced decode used for detection, small ones from a full decode.
+        Returns the crop and its x / y scale like detection_image().
+        """
+        factor = reduction_factor(max(cw, ch))
+        # Reuse an already decoded resolution if it is detailed enough
+        for decoded in sorted(self._images, reverse=True):
+            if decoded <= factor:
+                factor = decoded
+                break
+        image, sx, sy = self._decode(factor)
+        return image[int(cy * sy):int((cy + ch) * sy), int(cx * sx):int((cx + cw) * sx)], sx, sy
+
+class LetterboxCanvas:
+    """640x640 letterbox canvas and resize scratch buffer, reused for every crop of a request."""
+    def __init__(self, size: int = TARGET_SIZE):
+        self.size = size
+        self.canvas = np.zeros((size, size, 3), dtype=np.uint8)
+        self._scratch = np.empty(size * size * 3, dtype=np.uint8)
+
+    def fit(self, image, size: tuple = None) -> tuple:
+        """
+        Letterbox image onto the canvas, return (canvas, scale, [x_offset, y_offset], [new_w, new_h]).
+        size: (w, h) the image stands for at full resolution (it may come from a reduced decode),
+        the letterbox geometry is computed from it so it does not depend on the decode factor.
+        """
+        w, h = size or (image.shape[1], image.shape[0])
+        scale = self.size / max(h, w)
+        new_w = min(self.size, max(1, int(w * scale)))
+        new_h = min(self.size, max(1, int(h * scale)))
+
+        resized = self._scratch[:new_w * new_h * 3].reshape(new_h, new_w, 3)
+        cv2.resize(image, (new_w, new_h), dst=resized)
+
+        x_offset = (self.size - new_w) // 2
+        y_offset = (self.size - new_h) // 2
+        self.canvas[:] = 0
+        self.canvas[y_offset:y_offset + new_h, x_offset:x_offset + new_w] = resized
+        return self.canvas, scale, [x_offset, y_offset], [new_w, new_h]
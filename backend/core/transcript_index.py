@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+import unicodedata
+from api.state import open_sqlite
+from config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    video_name TEXT PRIMARY KEY,
+    source_mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    video_name TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    text TEXT NOT NULL,
+    norm_text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_time ON segments (video_name, start, end);
+CREATE TABLE IF NOT EXISTS postings (
+    gram TEXT NOT NULL,
+    segment_id INTEGER NOT NULL,
+    PRIMARY KEY (gram, segment_id)
+) WITHOUT ROWID;
+"""
+
+def normalize(text: str) -> str:
+    """NFKC (full-width -> half-width etc.), lowercase, drop whitespace."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return "".join(text.split())
+
+def ngrams(norm_text: str) -> set:
+    """
+    Unigrams and bigrams of the normalized text.
+    Japanese has no word boundaries, character n-grams need no tokenizer and
+    still let single-kanji names (e.g. 鯛) be found.
+    """
+    grams = set(norm_text)
+    grams.update(norm_text[i:i + 2] for i in range(len(norm_text) - 1))
+    return grams
+
+class TranscriptIndex:
+    """
+    Search index over all transcription.json files.
+    - Inverted index of character n-grams -> segments, for searching across videos.
+    - (video_name, start, end) index, for finding the segments spoken at a given time.
+    The JSON files stay the source of truth, the index is rebuilt per video when a file changes.
+    """
+    def __init__(self, db_path: str, transcription_dir: str, sync_interval: float = 10.0):
+        self.db_path = db_path
+        self.transcription_dir = transcription_dir
+        self.sync_interval = sync_interval
+        self._local = threading.local()
+        self._last_sync = 0.0
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = open_sqlite(self.db_path)
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def index_video(self, video_name: str, segments: list, source_mtime_ns: int = 0):
+        """Replace the indexed segments of one video."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete_video(conn, video_name)
+            for seg in segments:
+                text = seg.get("text", "")
+                norm_text = normalize(text)
+                cur = conn.execute(
+                    "INSERT INTO segments (video_name, start, end, text, norm_text) VALUES (?, ?, ?, ?, ?)",
+                    (video_name, float(seg["start"]), float(seg["end"]), text, norm_text),
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO postings (gram, segment_id) VALUES (?, ?)",
+                    [(gram, cur.lastrowid) for gram in ngrams(norm_text)],
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts (video_name, source_mtime_ns) VALUES (?, ?)",
+                (video_name, source_mtime_ns),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _delete_video(self, conn, video_name: str):
+        conn.execute(
+            "DELETE FROM postings WHERE segment_id IN (SELECT id FROM segments WHERE video_name = ?)",
+            (video_name,),
+        )
+        conn.execute("DELETE FROM segments WHERE video_name = ?", (video_name,))
+        conn.execute("DELETE FROM transcripts WHERE video_name = ?", (video_name,))
+
+    def sync(self, force: bool = False):
+        """(Re)index transcription.json files that are new or changed since they were indexed."""
+        now = time.time()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+
+        if not os.path.exists(self.transcription_dir):
+            return
+
+        conn = self._connect()
+        indexed = dict(conn.execute("SELECT video_name, source_mtime_ns FROM transcripts").fetchall())
+
+        seen = set()
+        for video_name in os.listdir(self.transcription_dir):
+            path = os.path.join(self.transcription_dir, video_name, "transcription.json")
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            seen.add(video_name)
+            if indexed.get(video_name) == mtime_ns:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    segments = json.load(f)
+                self.index_video(video_name, segments, mtime_ns)
+                print(f"Indexed transcription of {video_name} ({len(segments)} segments)")
+            except Exception as e:
+                print(f"Error indexing transcription {path}: {e}")
+
+        for video_name in set(indexed) - seen:
+            conn.execute("BEGIN IMMEDIATE")
+            self._delete_video(conn, video_name)
+            conn.execute("COMMIT")
+
+    def search(self, query: str, video_name: str = None, limit: int = 50) -> list:
+        """Segments whose text contains query, across all videos (or one video)."""
+        norm_query = normalize(query)
+        if not norm_query:
+            return []
+
+        grams = [norm_query] if len(norm_query) == 1 else sorted({norm_query[i:i + 2] for i in range(len(norm_query) - 1)})
+        placeholders = ",".join("?" * len(grams))
+        sql = (
+            "SELECT s.video_name, s.start, s.end, s.text, s.norm_text FROM segments s "
+            f"JOIN (SELECT segment_id FROM postings WHERE gram IN ({placeholders}) "
+            "GROUP BY segment_id HAVING COUNT(*) = ?) p ON p.segment_id = s.id "
+        )
+        params = grams + [len(grams)]
+        if video_name:
+            sql += "WHERE s.video_name = ? "
+            params.append(video_name)
+        sql += "ORDER BY s.video_name, s.start"
+
+        results = []
+        for vname, start, end, text, norm_text in self._connect().execute(sql, params):
+            # All bigrams present does not guarantee they are adjacent, verify
+            if norm_query not in norm_text:
+                continue
+            results.append({"video_name": vname, "start": start, "end": end, "text": text})
+            if len(results) >= limit:
+                break
+        return results
+
+    def segments_at(self, video_name: str, timestamp: float, padding: float = 0.0) -> list:
+        """Segments of a video that overlap [timestamp - padding, timestamp + padding]."""
+        rows = self._connect().execute(
+            "SELECT start, end, text FROM segments WHERE video_name = ? AND start <= ? AND end >= ? ORDER BY start",
+            (video_name, timestamp + padding, timestamp - padding),
+        ).fetchall()
+        return [{"start": start, "end": end, "text": text} for start, end, text in rows]
+
+_index = None
+
+def get_transcript_index() -> TranscriptIndex:
+    global _index
+    if _index is None:
+        _index = TranscriptIndex(settings.TRANSCRIPT_INDEX_PATH, settings.TRANSCRIPTION_DIR)
+    return _index
@@ -3,46 +3,62 @@ import json
 import whisper
 import torch
 from config import settings
+from core.transcript_index import get_transcript_index
 
 # Global model cache
 _whisper_model = None
 _current_model_name = None
+_current_device = None
 
-def get_whisper_model(model_name="large"):
-    global _whisper_model, _current_model_name
+def get_whisper_model(model_name="large", device: str = None):
+    global _whisper_model, _current_model_name, _current_device
     
-    if _whisper_model is not None and _current_model_name == model_name:
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    if _whisper_model is not None and _current_model_name == model_name and _current_device == device:
         return _whisper_model
         
     print(f"Loading Whisper model ({model_name})...")
-    device = "cuda" if torch.cuda.is_available() else "cpu"
+    _whisper_model = None # Free the previous model first
     _whisper_model = whisper.load_model(model_name, device=device)
     _current_model_name = model_name
+    _current_device = device
     print(f"Whisper model ({model_name}) loaded on {device}")
     return _whisper_model
 
-def transcribe_video(video_path: str, video_name: str, model_name: str = "large", force: bool = False):
+def cached_transcription(video_name: str):
+    """Saved segments of a video, None if it has not been transcribed (or the file is unreadable)."""
+    save_path = os.path.join(settings.TRANSCRIPTION_DIR, video_name, "transcription.json")
+    if not os.path.exists(save_path):
+        return None
+    print(f"Transcription already exists for {video_name}")
+    try:
+        with open(save_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading existing transcription: {e}. Re-transcribing.")
+        return None
+
+def transcribe_video(video_path: str, video_name: str, model_name: str = "large", force: bool = False, device: str = None):
     """
     Transcribe video using Whisper.
     Returns list of segments: {text, start, end}
     Saves result to JSON.
+    device: torch device to run on (default: cuda if available)
     """
     save_dir = os.path.join(settings.TRANSCRIPTION_DIR, video_name)
     os.makedirs(save_dir, exist_ok=True)
     save_path = os.path.join(save_dir, "transcription.json")
     
     # Check if exists
-    if not force and os.path.exists(save_path):
-        print(f"Transcription already exists for {video_name}")
-        try:
-            with open(save_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error reading existing transcription: {e}. Re-transcribing.")
-            # Fall through to re-transcribe
+    if not force:
+        segments = cached_transcription(video_name)
+        if segments is not None:
+            return segments
     
     print(f"Transcribing {video_path} with model {model_name}...")
-    model = get_whisper_model(model_name)
+    model = get_whisper_model(model_name, device=device)
     
     # Transcribe
     # language='ja' for Japanese
@@ -61,4 +77,10 @@ def transcribe_video(video_path: str, video_name: str, model_name: str = "large"
         json.dump(segments, f, ensure_ascii=False, indent=2)
         
     print(f"Transcription saved to {save_path}")
+
+    try:
+        get_transcript_index().index_video(video_name, segments, os.stat(save_path).st_mtime_ns)
+    except Exception as e:
+        # The index catches up on the next sync
+        print(f"Error indexing transcription: {e}")
     return segments
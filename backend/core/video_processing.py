@@ -1,44 +1,504 @@
+import collections
 import cv2
 import os
+import json
+import threading
+import time
 import numpy as np
 
-def is_blurry(image, threshold=0.0) -> bool:
+BLUR_THRESHOLD = 0.0
+OVEREXPOSURE_THRESHOLD = 220.0
+
+def frame_quality(image) -> tuple:
+    """Sharpness (Laplacian variance) and mean brightness of an image, from one gray conversion."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var()), float(np.mean(gray))
+
+def is_blurry(image, threshold=BLUR_THRESHOLD) -> bool:
     """Check if image is blurry using Laplacian variance."""
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     variance = cv2.Laplacian(gray, cv2.CV_64F).var()
     return variance < threshold
 
-def is_overexposed(image, threshold=220.0) -> bool:
+def is_overexposed(image, threshold=OVEREXPOSURE_THRESHOLD) -> bool:
     """Check if image is overexposed using mean brightness."""
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     mean_brightness = np.mean(gray)
     return mean_brightness > threshold
 
 from api.state import progress_store
+from config import settings
+
+# cv2.imwrite parameters of the pre-compressed frame variants
+VARIANT_WRITE_PARAMS = {
+    "webp": [cv2.IMWRITE_WEBP_QUALITY, 85],
+    "avif": [getattr(cv2, "IMWRITE_AVIF_QUALITY", 0), 60],
+}
+
+def write_frame_variants(frame, output_path: str, variants: list = None):
+    """Write pre-compressed variants (e.g. .webp) next to a .jpg frame for browsers that accept them."""
+    variants = settings.FRAME_VARIANTS if variants is None else variants
+    base = os.path.splitext(output_path)[0]
+    for variant in variants:
+        params = VARIANT_WRITE_PARAMS.get(variant)
+        if params is None:
+            continue
+        try:
+            if not cv2.imwrite(f"{base}.{variant}", frame, params):
+                print(f"Warning: could not write {variant} variant of {output_path}")
+        except cv2.error as e:
+            # e.g. OpenCV built without AVIF support
+            print(f"Warning: {variant} variant not supported: {e}")
+
+def fixed_rate_frames(cap, fps: float, total_frames: int, rate: float, progress=None, start_frame: int = 0, end_frame: int = None):
+    """Yield (frame_number, frame) every `rate` seconds by seeking, for frames in [start_frame, end_frame)."""
+    frame_interval = int(fps * rate)
+    if frame_interval == 0:
+        frame_interval = 1
+    if end_frame is None:
+        end_frame = total_frames
+
+    # Iterate by jumping, on a grid aligned to the start of the video so chunks line up
+    current_frame = -(-start_frame // frame_interval) * frame_interval
+    while True:
+        if progress and total_frames > 0:
+            progress(int((current_frame / total_frames) * 100))
+
+        if current_frame >= end_frame:
+            break
+            
+        # Seek and read
+        cap.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        yield current_frame, frame
+        current_frame += frame_interval
+
+def motion_score(prev_small, small) -> tuple:
+    """Mean absolute frame difference (0-1) and mean optical-flow magnitude (pixels) of two small gray frames."""
+    diff = float(np.mean(cv2.absdiff(prev_small, small))) / 255.0
+    flow = cv2.calcOpticalFlowFarneback(prev_small, small, None, 0.5, 2, 9, 2, 5, 1.1, 0)
+    magnitude = float(np.mean(np.sqrt(flow[..., 0] ** 2 + flow[..., 1] ** 2)))
+    return diff, magnitude
 
-def extract_frames(video_path: str, output_dir: str, rate: float = 1.0, limit: int = 0, model=None, video_name: str = None) -> list:
+def adaptive_frames(cap, fps: float, total_frames: int, rate: float, frame_budget: int = 0, progress=None,
+                    start_frame: int = 0, end_frame: int = None, state: dict = None):
     """
-    Extract frames from a video at a given rate, filtering with YOLO and quality checks.
+    Yield (frame_number, frame) where motion or scene change peaks, in one sequential pass over [start_frame, end_frame).
+
+    Frames are analysed at ADAPTIVE_ANALYSIS_FPS on a downscaled gray copy. The score combines
+    frame difference (scene changes) and optical-flow magnitude (moving fish), each normalized by
+    its running average. Local score peaks above an adaptive threshold are emitted; the threshold
+    is steered so that about `frame_budget` frames come out over the range
+    (default: as many as fixed-rate extraction would give), and once the budget is used up only
+    peaks stop, the scan goes on to the end. A frame is also emitted at least every
+    ADAPTIVE_MAX_GAP seconds so that quiet stretches keep some coverage.
+
+    The budget and its pace are for the whole video. Chunked extraction scans one range per call and
+    passes the same `state` dict to each (threshold, running averages, counts, last emitted frame),
+    so the ranges behave like one pass: frames go where the motion is, gaps span range boundaries.
     """
-    print(f"Extracting frames from {video_path} to {output_dir} (rate={rate})")
-    
-    if video_name:
-        progress_store[video_name] = 0
+    if end_frame is None:
+        end_frame = total_frames
+    stride = max(1, int(round(fps / settings.ADAPTIVE_ANALYSIS_FPS)))
+    total_samples = max(1, total_frames // stride)
+    if frame_budget <= 0:
+        frame_budget = max(1, int(total_frames / fps / rate))
+    min_gap = int(settings.ADAPTIVE_MIN_GAP * fps)
+    max_gap = int(settings.ADAPTIVE_MAX_GAP * fps)
+    analysis_width = settings.ADAPTIVE_ANALYSIS_WIDTH
+
+    state = {} if state is None else state
+    emitted = state.get("emitted", 0)
+    samples = state.get("samples", 0)
+    threshold = state.get("threshold", 1.0)
+    avg_diff = state.get("avg_diff")
+    avg_flow = state.get("avg_flow")
+    # A range that continues a previous one starts without forcing a frame
+    last_emitted = state.get("last_emitted", -max_gap if start_frame == 0 else start_frame)
+    prev_small = None
+    # One-sample lookahead for peak detection: (score, frame_number, frame)
+    before = None
+    candidate = None
+
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    frame_number = start_frame - 1
+    try:
+        while True:
+            frame_number += 1
+            if frame_number >= end_frame:
+                break
+            if frame_number % stride != 0:
+                # Advance without decoding into a numpy array
+                if not cap.grab():
+                    break
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+            samples += 1
+
+            if progress and total_frames > 0:
+                progress(int((frame_number / total_frames) * 100))
+
+            h, w = frame.shape[:2]
+            small = cv2.resize(frame, (analysis_width, max(1, int(h * analysis_width / w))), interpolation=cv2.INTER_AREA)
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+            if prev_small is None:
+                prev_small = small
+                if start_frame > 0:
+                    continue
+                # Always start with the first frame
+                yield frame_number, frame
+                emitted += 1
+                last_emitted = frame_number
+                continue
+
+            diff, flow = motion_score(prev_small, small)
+            prev_small = small
+
+            # Running averages make the score independent of the video's overall activity level
+            avg_diff = diff if avg_diff is None else 0.95 * avg_diff + 0.05 * diff
+            avg_flow = flow if avg_flow is None else 0.95 * avg_flow + 0.05 * flow
+            score = 0.5 * diff / (avg_diff + 1e-6) + 0.5 * flow / (avg_flow + 1e-6)
+
+            current = (score, frame_number, frame)
+            if candidate is not None and before is not None:
+                # candidate is a local maximum
+                if candidate[0] >= before[0] and candidate[0] > score:
+                    if (emitted < frame_budget and candidate[0] >= threshold
+                            and candidate[1] > last_emitted and candidate[1] - last_emitted >= min_gap):
+                        yield candidate[1], candidate[2]
+                        emitted += 1
+                        last_emitted = candidate[1]
+
+            if frame_number - last_emitted >= max_gap:
+                yield frame_number, frame
+                emitted += 1
+                last_emitted = frame_number
+
+            # Steer the threshold towards the budget pace
+            expected = frame_budget * samples / total_samples
+            threshold *= 1.02 if emitted > expected else 0.98
+            threshold = min(max(threshold, 0.25), 8.0)
+
+            before, candidate = candidate, current
+    finally:
+        # Also when the caller stops early (frame limit), the next range continues from here
+        state.update(emitted=emitted, samples=samples, threshold=threshold,
+                     avg_diff=avg_diff, avg_flow=avg_flow, last_emitted=last_emitted)
+
+FISH_INDEX_FILENAME = "fish_index.json"
+
+class FishGate:
+    """
+    Keeps only frames with fish, for extraction.
+    Frames are buffered and sent to the detector in batches of downscaled copies
+    (one batched forward pass instead of one full-resolution predict per frame).
+    Per-frame fish count and max confidence are recorded for the sidecar index.
+    """
+    def __init__(self, detector, batch_size: int = None, imgsz: int = None, conf: float = None):
+        self.detector = detector
+        self.batch_size = batch_size or settings.FISH_GATE_BATCH
+        self.imgsz = imgsz or settings.FISH_GATE_IMGSZ
+        self.conf = settings.FISH_GATE_CONF if conf is None else conf
+        self.pending = []
+        self.records = []
+        self.by_frame = {}
+
+    def add(self, frame_number: int, frame) -> list:
+        """Queue a frame, return the (frame_number, frame) pairs that passed once a batch is evaluated."""
+        self.pending.append((frame_number, frame))
+        if len(self.pending) >= self.batch_size:
+            return self.flush()
+        return []
+
+    def flush(self) -> list:
+        if not self.pending:
+            return []
+
+        batch, self.pending = self.pending, []
+        smalls = []
+        for _, frame in batch:
+            h, w = frame.shape[:2]
+            scale = self.imgsz / max(h, w)
+            if scale < 1:
+                frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+            smalls.append(frame)
+
+        try:
+            detections = self.detector.detect_batch(smalls, conf=self.conf, imgsz=self.imgsz)
+        except Exception as e:
+            # Better to keep frames than to silently lose a batch
+            print(f"Warning: fish gate inference failed on frames {batch[0][0]}-{batch[-1][0]}: {e}")
+            detections = [None] * len(batch)
+
+        passed = []
+        for (frame_number, frame), dets in zip(batch, detections):
+            if dets is None:
+                self._record({"frame": frame_number, "fish": None, "max_conf": None, "kept": True})
+                passed.append((frame_number, frame))
+                continue
+            max_conf = max((d["conf"] for d in dets), default=0.0)
+            kept = len(dets) > 0
+            self._record({"frame": frame_number, "fish": len(dets), "max_conf": round(max_conf, 4), "kept": kept})
+            if kept:
+                passed.append((frame_number, frame))
+        return passed
+
+    def _record(self, record: dict):
+        self.records.append(record)
+        self.by_frame[record["frame"]] = record
+
+    def write_index(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"conf": self.conf, "imgsz": self.imgsz, "frames": self.records}, f)
+
+    def load_index(self, path: str, before_frame: int):
+        """Restore the records of frames before `before_frame`, when resuming an interrupted extraction."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                records = json.load(f).get("frames", [])
+        except (OSError, ValueError):
+            return
+        for record in records:
+            if record["frame"] < before_frame:
+                self._record(record)
+
+FRAME_INDEX_FILENAME = "frames_index.json"
+FRAME_INDEX_COLUMNS = ["frame", "timestamp", "file", "bytes", "sharpness", "brightness", "fish", "max_conf"]
+
+def parse_frame_number(filename: str) -> int:
+    """<video>_T00M00S_<frame>.jpg -> frame"""
+    return int(os.path.splitext(filename)[0].split('_')[-1])
+
+def write_frame_index(output_dir: str, index: dict):
+    # Write-then-rename so readers never see a half-written index
+    tmp_path = os.path.join(output_dir, FRAME_INDEX_FILENAME + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_path, os.path.join(output_dir, FRAME_INDEX_FILENAME))
+
+def read_frame_index(output_dir: str):
+    path = os.path.join(output_dir, FRAME_INDEX_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+# Parsed indexes of the most recently used videos (a 10k-frame index is a few MB in memory)
+INDEX_CACHE_SIZE = 16
+_index_cache = collections.OrderedDict()
+_index_cache_lock = threading.Lock()
+
+def cached_frame_index(output_dir: str):
+    """
+    read_frame_index with an in-process LRU cache keyed by the index file's mtime,
+    so serving /frames pages does not re-parse a 10k-frame index each time.
+    """
+    path = os.path.join(output_dir, FRAME_INDEX_FILENAME)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    with _index_cache_lock:
+        cached = _index_cache.get(path)
+        if cached and cached[0] == mtime_ns:
+            _index_cache.move_to_end(path)
+            return cached[1]
+
+    index = read_frame_index(output_dir)
+    # Timestamps for range queries by time (rows are in frame order)
+    index["timestamps"] = [row[1] for row in index["frames"]]
+    with _index_cache_lock:
+        _index_cache[path] = (mtime_ns, index)
+        _index_cache.move_to_end(path)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+def index_rows(index: dict) -> list:
+    """Frame index rows as dicts."""
+    columns = index["columns"]
+    return [dict(zip(columns, row)) for row in index["frames"]]
+
+def build_frame_index_from_files(video_path: str, output_dir: str) -> dict:
+    """Index for frame caches extracted before frames_index.json existed (no quality scores)."""
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+    cap.release()
+    if fps <= 0:
+        fps = 30.0 # Fallback
+
+    files = sorted((f for f in os.listdir(output_dir) if f.endswith('.jpg')), key=parse_frame_number)
+    width = height = None
+    if files:
+        first = cv2.imread(os.path.join(output_dir, files[0]))
+        if first is not None:
+            height, width = first.shape[:2]
+
+    rows = []
+    for f in files:
+        frame_number = parse_frame_number(f)
+        size = os.path.getsize(os.path.join(output_dir, f))
+        rows.append([frame_number, round(frame_number / fps, 3), f, size, None, None, None, None])
+
+    return {
+        "video": os.path.splitext(os.path.basename(video_path))[0],
+        "fps": fps,
+        "total_frames": total_frames,
+        "width": width,
+        "height": height,
+        "mode": None,
+        "columns": FRAME_INDEX_COLUMNS,
+        "frames": rows,
+    }
+
+COMPLETE_MARKER_FILENAME = ".complete"
+EXTRACTION_LOCK_FILENAME = ".extracting"
+
+class ExtractionInProgress(Exception):
+    """Another worker or process is extracting the same video."""
+
+def is_extraction_complete(output_dir: str) -> bool:
+    """True when all chunks of the video were extracted (partial caches have no marker)."""
+    return os.path.exists(os.path.join(output_dir, COMPLETE_MARKER_FILENAME))
+
+def _mark_complete(output_dir: str):
+    with open(os.path.join(output_dir, COMPLETE_MARKER_FILENAME), 'w', encoding='utf-8') as f:
+        f.write(time.strftime("%Y-%m-%dT%H:%M:%S"))
+
+def acquire_extraction_lock(output_dir: str) -> bool:
+    """
+    Create the lock file of a frame directory, False if another process holds it.
+    The holder refreshes the lock's mtime while it works, a lock older than EXTRACTION_LOCK_STALE is taken over.
+    """
+    path = os.path.join(output_dir, EXTRACTION_LOCK_FILENAME)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                age = time.time() - os.path.getmtime(path)
+            except OSError:
+                continue # Released in the meantime
+            if age < settings.EXTRACTION_LOCK_STALE:
+                return False
+            print(f"Taking over stale extraction lock {path}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+def is_extraction_locked(output_dir: str) -> bool:
+    """True while some process holds a fresh (not stale) extraction lock on the frame directory."""
+    try:
+        age = time.time() - os.path.getmtime(os.path.join(output_dir, EXTRACTION_LOCK_FILENAME))
+    except OSError:
+        return False
+    return age < settings.EXTRACTION_LOCK_STALE
+
+def release_extraction_lock(output_dir: str):
+    try:
+        os.remove(os.path.join(output_dir, EXTRACTION_LOCK_FILENAME))
+    except OSError:
+        pass
+
+def extract_frames(video_path: str, output_dir: str, rate: float = 1.0, limit: int = 0, model=None, video_name: str = None,
+                   mode: str = "fixed", frame_budget: int = 0, chunk_seconds: float = None) -> list:
+    """
+    Extract frames from a video, filtering with quality checks and optionally a fish gate.
+    model: detector with detect_batch() (see core.model_service), frames without fish are skipped.
+    mode="fixed" samples one frame every `rate` seconds.
+    mode="adaptive" samples where motion / scene changes peak, about `frame_budget` frames in total.
+
+    The video is processed in chunks of `chunk_seconds` (default EXTRACTION_CHUNK_SECONDS). After each
+    chunk the frame index is rewritten as a checkpoint, so frames can be served while the rest is
+    extracted and an interrupted extraction resumes at the first unfinished chunk. The .complete
+    marker is written when the whole video is done.
+    Raises ExtractionInProgress if another process is extracting the same video.
+    """
+    print(f"Extracting frames from {video_path} to {output_dir} (mode={mode}, rate={rate})")
     
     if not os.path.exists(output_dir):
         os.makedirs(output_dir, exist_ok=True)
-    
-    # Check cache first
-    cached_files = sorted([os.path.join(output_dir, f) for f in os.listdir(output_dir) if f.endswith('.jpg')])
-    if cached_files:
-        print(f"Found {len(cached_files)} cached frames.")
-        if video_name:
-            progress_store[video_name] = 100
-        return cached_files
+
+    cached = _cached_frames(video_path, output_dir, video_name, rate)
+    if cached is not None:
+        return cached
 
     if not os.path.exists(video_path):
         raise FileNotFoundError(f"Video file not found: {video_path}")
-        
+
+    if not acquire_extraction_lock(output_dir):
+        raise ExtractionInProgress(f"Frames of {video_path} are being extracted by another process")
+    try:
+        # Another process may have finished while we waited for the lock
+        cached = _cached_frames(video_path, output_dir, video_name, rate)
+        if cached is not None:
+            return cached
+        # Only the lock holder resets the progress, other callers would clobber the running extraction's
+        if video_name:
+            progress_store[video_name] = 0
+        return _extract_chunks(video_path, output_dir, rate, limit, model, video_name, mode, frame_budget,
+                               chunk_seconds or settings.EXTRACTION_CHUNK_SECONDS)
+    finally:
+        release_extraction_lock(output_dir)
+
+def _cached_frames(video_path: str, output_dir: str, video_name: str, rate: float = 1.0):
+    """Frame paths of a finished cache, None if the video (still) needs extracting."""
+    # The frame index lists the extracted frames in order, no directory listing needed
+    index = read_frame_index(output_dir)
+    if index is None:
+        if not any(f.endswith('.jpg') for f in os.listdir(output_dir)):
+            return None
+        # Cache from before frame indexes existed (chunked extraction writes its index before the
+        # first frame). The old extractor could be interrupted too, keep it only if it reached the end.
+        index = build_frame_index_from_files(video_path, output_dir)
+        if not _reached_end(index, rate):
+            print(f"Legacy frame cache {output_dir} stops before the end of the video, extracting again")
+            return None
+        write_frame_index(output_dir, index)
+    elif not index.get("complete", True):
+        # Checkpoint of a partial extraction
+        return None
+
+    if not is_extraction_complete(output_dir):
+        _mark_complete(output_dir)
+    print(f"Found {len(index['frames'])} cached frames.")
+    if video_name:
+        progress_store[video_name] = 100
+    return [os.path.join(output_dir, row[2]) for row in index["frames"]]
+
+def _reached_end(index: dict, rate: float) -> bool:
+    """
+    True if the last frame of a legacy cache is within one sampling interval of the video's end.
+    Gated or adaptive caches can legitimately stop earlier, those are extracted again (wasted work, not wrong frames).
+    """
+    if index["total_frames"] <= 0:
+        # Video unreadable, nothing to compare against
+        return True
+    frame_interval = max(1, int(index["fps"] * rate))
+    return index["frames"][-1][0] >= index["total_frames"] - frame_interval
+
+def _extract_chunks(video_path: str, output_dir: str, rate: float, limit: int, model, video_name: str,
+                    mode: str, frame_budget: int, chunk_seconds: float) -> list:
+    if mode not in ("fixed", "adaptive"):
+        raise ValueError(f"Unknown sampling mode: {mode}")
+
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise ValueError(f"Could not open video: {video_path}")
@@ -48,75 +508,159 @@ def extract_frames(video_path: str, output_dir: str, rate: float = 1.0, limit: i
     
     if fps <= 0:
         fps = 30.0 # Fallback
+
+    chunk_frames = max(1, int(round(chunk_seconds * fps)))
+    num_chunks = max(1, -(-total_frames // chunk_frames))
+    video_base = os.path.splitext(os.path.basename(video_path))[0]
+    lock_path = os.path.join(output_dir, EXTRACTION_LOCK_FILENAME)
+    heartbeat = [time.time()]
+
+    def update_progress(value: int):
+        if video_name:
+            progress_store[video_name] = value
+        # Keep the lock fresh so other processes do not take it over
+        if time.time() - heartbeat[0] > 10:
+            heartbeat[0] = time.time()
+            try:
+                os.utime(lock_path)
+            except OSError:
+                pass
+
+    # Resume from the checkpoint if it was made with the same parameters
+    params = {"mode": mode, "rate": rate, "frame_budget": frame_budget, "chunk_frames": chunk_frames}
+    index = read_frame_index(output_dir)
+    if index is not None and index.get("checkpoint") == params:
+        index_rows_out = index["frames"]
+        next_chunk = index["next_chunk"]
+        frame_size = [index.get("width"), index.get("height")]
+        # Sampler state of adaptive mode, continued from the last indexed frame for older checkpoints
+        adaptive_state = index.get("adaptive") or {}
+        if mode == "adaptive" and not adaptive_state and index_rows_out:
+            stride = max(1, int(round(fps / settings.ADAPTIVE_ANALYSIS_FPS)))
+            adaptive_state = {
+                "emitted": len(index_rows_out),
+                "samples": next_chunk * chunk_frames // stride,
+                "last_emitted": index_rows_out[-1][0],
+            }
+        print(f"Resuming extraction of {video_base} at chunk {next_chunk + 1}/{num_chunks} ({len(index_rows_out)} frames done)")
+    else:
+        index_rows_out = []
+        next_chunk = 0
+        frame_size = [None, None]
+        adaptive_state = {}
+
+    gate = FishGate(model) if model else None
+    fish_index_path = os.path.join(output_dir, FISH_INDEX_FILENAME)
+    if gate is not None and next_chunk > 0:
+        gate.load_index(fish_index_path, before_frame=next_chunk * chunk_frames)
+
+    extracted_frames = [os.path.join(output_dir, row[2]) for row in index_rows_out]
+    # (sharpness, brightness) of frames waiting in the fish gate
+    quality = {}
+
+    def checkpoint(done_chunks: int, complete: bool = False):
+        write_frame_index(output_dir, {
+            "video": video_base,
+            "fps": fps,
+            "total_frames": total_frames,
+            "width": frame_size[0],
+            "height": frame_size[1],
+            "mode": mode,
+            "columns": FRAME_INDEX_COLUMNS,
+            "frames": index_rows_out,
+            "complete": complete,
+            "next_chunk": done_chunks,
+            "chunks": num_chunks,
+            "checkpoint": params,
+            "adaptive": adaptive_state if mode == "adaptive" else None,
+        })
+
+    def save_frame(current_frame: int, frame) -> bool:
+        """Write a frame, return True when the limit is reached."""
+        timestamp = current_frame / fps
+        minutes = int(timestamp // 60)
+        seconds = int(timestamp % 60)
+        filename = f"{video_base}_T{minutes:02d}M{seconds:02d}S_{current_frame}.jpg"
+        output_path = os.path.join(output_dir, filename)
         
-    frame_interval = int(fps * rate)
-    if frame_interval == 0:
-        frame_interval = 1
+        ok, buf = cv2.imencode(".jpg", frame)
+        if not ok:
+            print(f"Warning: failed to encode frame {current_frame}")
+            return False
+        with open(output_path, 'wb') as f:
+            f.write(buf.tobytes())
+        write_frame_variants(frame, output_path)
+        extracted_frames.append(output_path)
+        print(f"Saved frame {len(extracted_frames)}: {output_path}")
+
+        frame_size[:] = [frame.shape[1], frame.shape[0]]
+        sharpness, brightness = quality.pop(current_frame, (None, None))
+        fish = gate.by_frame.get(current_frame, {}) if gate else {}
+        index_rows_out.append([
+            current_frame, round(timestamp, 3), filename, len(buf),
+            None if sharpness is None else round(sharpness, 2),
+            None if brightness is None else round(brightness, 2),
+            fish.get("fish"), fish.get("max_conf")
+        ])
         
-    extracted_frames = []
-    saved_count = 0
-    
-    # Iterate by jumping
-    current_frame = 0
-    while True:
-        if video_name and total_frames > 0:
-            progress = int((current_frame / total_frames) * 100)
-            progress_store[video_name] = progress
+        return limit > 0 and len(extracted_frames) >= limit
 
-        if current_frame >= total_frames:
-            break
-            
-        # Seek and read
-        cap.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
-        ret, frame = cap.read()
-        if not ret:
-            break
+    def save_passed(batch) -> bool:
+        for current_frame, frame in batch:
+            if save_frame(current_frame, frame):
+                return True
+        return False
 
-        # Quality Checks
-        if is_blurry(frame):
-            # print(f"Skipped frame {current_frame}: Blurry") # Too noisy
-            current_frame += frame_interval
-            continue
-            
-        if is_overexposed(frame):
-            # print(f"Skipped frame {current_frame}: Overexposed") # Too noisy
-            current_frame += frame_interval
-            continue
+    if next_chunk == 0:
+        # Written before the first frame: frames without an index are never mistaken for a finished cache
+        checkpoint(0)
 
-        # YOLO Filtering
-        has_fish = False
-        if model:
-            try:
-                # Run inference
-                # verbose=False to reduce noise
-                # conf=0.5 as requested
-                results = model.predict(frame, conf=0.5, verbose=False)
-                # Check if any boxes detected
-                if len(results) > 0 and len(results[0].boxes) > 0:
-                    has_fish = True
-            except Exception as e:
-                print(f"Warning: YOLO inference failed on frame {current_frame}: {e}")
-                has_fish = False
+    limit_reached = limit > 0 and len(extracted_frames) >= limit
+    for chunk in range(next_chunk, num_chunks):
+        if limit_reached:
+            break
+        start_frame = chunk * chunk_frames
+        end_frame = min(total_frames, start_frame + chunk_frames)
+
+        if mode == "adaptive":
+            # One budget and threshold for the whole video, carried from chunk to chunk
+            candidates = adaptive_frames(cap, fps, total_frames, rate, frame_budget=frame_budget, progress=update_progress,
+                                         start_frame=start_frame, end_frame=end_frame, state=adaptive_state)
         else:
-            # If no model provided, save all (fallback)
-            has_fish = True
-
-        if has_fish:
-            timestamp = current_frame / fps
-            minutes = int(timestamp // 60)
-            seconds = int(timestamp % 60)
-            filename = f"{os.path.splitext(os.path.basename(video_path))[0]}_T{minutes:02d}M{seconds:02d}S_{current_frame}.jpg"
-            output_path = os.path.join(output_dir, filename)
-            
-            cv2.imwrite(output_path, frame)
-            extracted_frames.append(output_path)
-            saved_count += 1
-            print(f"Saved frame {saved_count}: {output_path} (Fish detected)")
-            
-            if limit > 0 and saved_count >= limit:
+            candidates = fixed_rate_frames(cap, fps, total_frames, rate, progress=update_progress,
+                                           start_frame=start_frame, end_frame=end_frame)
+
+        for current_frame, frame in candidates:
+            # Quality Checks
+            sharpness, brightness = frame_quality(frame)
+            if sharpness < BLUR_THRESHOLD:
+                # print(f"Skipped frame {current_frame}: Blurry") # Too noisy
+                continue
+                
+            if brightness > OVEREXPOSURE_THRESHOLD:
+                # print(f"Skipped frame {current_frame}: Overexposed") # Too noisy
+                continue
+
+            quality[current_frame] = (sharpness, brightness)
+            if gate is None:
+                # No model provided, save all (fallback)
+                limit_reached = save_frame(current_frame, frame)
+            else:
+                limit_reached = save_passed(gate.add(current_frame, frame))
+
+            if limit_reached:
                 break
-        
-        current_frame += frame_interval
+
+        # Frames still in the gate belong to this chunk, decide on them before checkpointing
+        if gate is not None:
+            if not limit_reached:
+                limit_reached = save_passed(gate.flush())
+            gate.write_index(fish_index_path)
+
+        checkpoint(chunk + 1)
+
+    checkpoint(num_chunks, complete=True)
+    _mark_complete(output_dir)
         
     cap.release()
     if video_name:
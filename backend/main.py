@@ -1,8 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from api.endpoints import router as api_router
+from api.admin import router as admin_router
 from config import settings
+from core.executors import ExecutorBusy
+from core.profiling import SlowRequestMiddleware
 from fastapi.staticfiles import StaticFiles
+from api.static_files import CachedStaticFiles
 import os
 
 app = FastAPI(title="Fish Annotation Tool API")
@@ -20,7 +25,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-stage trace of API requests, slow ones are logged (and listed at /api/admin/slow_requests)
+if settings.SLOW_REQUEST_MS > 0:
+    app.add_middleware(SlowRequestMiddleware, threshold_ms=settings.SLOW_REQUEST_MS)
+
 app.include_router(api_router, prefix="/api")
+app.include_router(admin_router, prefix="/api")
+
+@app.exception_handler(ExecutorBusy)
+async def executor_busy_handler(request: Request, exc: ExecutorBusy):
+    # Backpressure: tell the client to retry instead of queueing without bound
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 # Ensure data directories exist
 os.makedirs("data/frames", exist_ok=True)
@@ -34,7 +49,8 @@ if not os.path.exists(settings.FRAME_CACHE_DIR):
     except Exception as e:
         print(f"Warning: Could not create cache dir {settings.FRAME_CACHE_DIR}: {e}")
 
-app.mount("/static/frames", StaticFiles(directory=settings.FRAME_CACHE_DIR), name="frames")
+# Frame URLs carry a version of the source video (?v=...), so they can be cached forever
+app.mount("/static/frames", CachedStaticFiles(directory=settings.FRAME_CACHE_DIR, max_age=settings.STATIC_MAX_AGE, variants=settings.FRAME_VARIANTS), name="frames")
 
 # Mount annotations directory
 if not os.path.exists(settings.ANNOTATION_DIR):
@@ -43,11 +59,14 @@ if not os.path.exists(settings.ANNOTATION_DIR):
     except Exception as e:
         print(f"Warning: Could not create annotation dir {settings.ANNOTATION_DIR}: {e}")
 
-app.mount("/static/annotations", StaticFiles(directory=settings.ANNOTATION_DIR), name="annotations")
+# Saved annotation filenames contain a unique id and are never rewritten in place
+app.mount("/static/annotations", CachedStaticFiles(directory=settings.ANNOTATION_DIR, max_age=settings.STATIC_MAX_AGE), name="annotations")
 
 # Keep /data for backward compatibility or other assets if needed, but frames are now in /static/frames
 if not os.path.exists("data"):
     os.makedirs("data")
+# Crop filenames contain a timestamp, so they are immutable as well
+app.mount("/data/crops", CachedStaticFiles(directory="data/crops", max_age=settings.STATIC_MAX_AGE), name="crops")
 app.mount("/data", StaticFiles(directory="data"), name="data") 
 
 # Mount video directory if it exists
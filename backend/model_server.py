@@ -0,0 +1,9 @@
+from config import settings
+from core.model_service import serve_models, default_model_server_address
+
+# Dedicated process holding YOLO / SAM / Whisper so that models are loaded once,
+# no matter how many uvicorn workers are running (see start_server.sh).
+
+if __name__ == "__main__":
+    address = settings.MODEL_SERVER_ADDRESS or default_model_server_address()
+    serve_models(address, settings.MODEL_SERVER_AUTHKEY)
@@ -2,8 +2,25 @@ import os
 import sys
 import glob
 from config import settings
-from core.video_processing import extract_frames
-from core.transcription import transcribe_video
+from core.video_processing import extract_frames, is_extraction_complete, ExtractionInProgress
+from core.model_service import get_models
+from core.transcription import transcribe_video, cached_transcription
+from core.device_scheduler import get_scheduler, BATCH
+
+def transcribe(video_path: str, video_name: str, model_name: str = "large"):
+    """
+    Transcribe through the device scheduler like every model call.
+    With a model server its scheduler (shared with the API) is used. Without one, Whisper runs here
+    under a lease of this process's scheduler, without loading the YOLO / SAM models of LocalModels.
+    """
+    if settings.MODEL_SERVER_ADDRESS:
+        return get_models().transcribe(video_path, video_name, model_name=model_name, force=False)
+    segments = cached_transcription(video_name)
+    if segments is not None:
+        return segments
+    # Whisper waits for its device, no CPU fallback (see LocalModels.transcribe)
+    with get_scheduler().lease(f"whisper-{model_name}", BATCH, fallback=False) as device:
+        return transcribe_video(video_path, video_name, model_name=model_name, force=False, device=device.torch_device)
 
 def preprocess_videos():
     video_dir = settings.VIDEO_DIR
@@ -30,7 +47,8 @@ def preprocess_videos():
 
         # 1. Frame Extraction
         video_frames_dir = os.path.join(frames_dir, video_name)
-        if os.path.exists(video_frames_dir) and len(os.listdir(video_frames_dir)) > 0:
+        # Partial (interrupted) extractions have no completion marker and are resumed
+        if is_extraction_complete(video_frames_dir):
             print(f"  [Skip] Frames already extracted for {video_name}")
         else:
             print(f"  [Action] Extracting frames for {video_name}...")
@@ -51,14 +69,19 @@ def preprocess_videos():
                 # Given the tool is for fish annotation, maybe they want fish only?
                 # But the prompt says "make it so loading is minimal", implying the goal is to avoid waiting for extraction when selecting a video.
                 # Standard extraction is fine.
-                extract_frames(video_path, video_frames_dir, rate=1.0, video_name=video_name)
+                # With EXTRACTION_FISH_GATE=1 only frames with fish are kept (batched, downscaled detection)
+                gate_model = get_models() if settings.EXTRACTION_FISH_GATE else None
+                extract_frames(video_path, video_frames_dir, rate=1.0, model=gate_model, video_name=video_name,
+                               mode=settings.FRAME_SAMPLING_MODE, frame_budget=settings.FRAME_BUDGET)
+            except ExtractionInProgress:
+                print(f"  [Skip] Frames of {video_name} are being extracted by another process")
             except Exception as e:
                 print(f"  [Error] Frame extraction failed: {e}")
 
         # 2. Transcription
         print(f"  [Action] Transcribing {video_name} (Model: large)...")
         try:
-            transcribe_video(video_path, video_name, model_name="large", force=False)
+            transcribe(video_path, video_name, model_name="large")
         except Exception as e:
             print(f"  [Error] Transcription failed: {e}")
 
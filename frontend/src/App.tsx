@@ -77,27 +77,56 @@ function App() {
       }
     }, 1000);
 
-    fetchFrames(selectedVideoPath)
-      .then(res => {
-        setFrames(res.frames);
-        setCurrentFrameIndex(0);
-        setProgress(100);
-      })
-      .catch(err => {
-        console.error(err);
-        alert("Failed to load frames");
-      })
-      .finally(() => {
-        setLoading(false);
-        clearInterval(progressInterval);
-      });
+    let cancelled = false;
+    let refreshTimer: ReturnType<typeof setTimeout> | undefined;
+
+    // Frames are served chunk by chunk while extraction runs, poll until the cache is complete.
+    // The list only ever grows, so each poll asks for the frames after the ones already loaded.
+    let loaded = 0;
+    const loadFrames = (first: boolean) => {
+      fetchFrames(selectedVideoPath, loaded)
+        .then(res => {
+          if (cancelled) return;
+          if (first) {
+            setFrames(res.frames);
+            setCurrentFrameIndex(0);
+          } else if (res.frames.length > 0) {
+            // Keep the same array while nothing new arrived
+            setFrames(prev => [...prev, ...res.frames]);
+          }
+          loaded += res.frames.length;
+          if (loaded > 0) setLoading(false);
+
+          if (res.complete) {
+            setProgress(100);
+            setLoading(false);
+            clearInterval(progressInterval);
+          } else {
+            refreshTimer = setTimeout(() => loadFrames(false), 3000);
+          }
+        })
+        .catch(err => {
+          if (cancelled) return;
+          console.error(err);
+          alert("Failed to load frames");
+          setLoading(false);
+          clearInterval(progressInterval);
+        });
+    };
+    loadFrames(true);
 
-    return () => clearInterval(progressInterval);
+    return () => {
+      cancelled = true;
+      clearInterval(progressInterval);
+      clearTimeout(refreshTimer);
+    };
   }, [selectedVideoPath]);
 
   // Load annotations and trigger auto-detect when frame changes
+  // (not when more frames arrive from a running extraction)
+  const hasFrames = frames.length > 0;
   useEffect(() => {
-    if (!selectedVideoPath || frames.length === 0) return;
+    if (!selectedVideoPath || !hasFrames) return;
 
     const videoName = selectedVideoPath.split('/').pop()?.split('.')[0] || "";
     if (!videoName) return;
@@ -122,7 +151,7 @@ function App() {
       }, 100);
       return () => clearTimeout(timer);
     }
-  }, [currentFrameIndex, selectedVideoPath, frames.length, autoMode]);
+  }, [currentFrameIndex, selectedVideoPath, hasFrames, autoMode]);
 
   // Transcription Effect
   useEffect(() => {
@@ -1,3 +1,4 @@
+import type { CSSProperties } from 'react';
 import { getApiBaseUrl } from './config';
 
 export const BASE_URL = getApiBaseUrl();
@@ -11,6 +12,34 @@ export interface VideoInfo {
 export interface FrameResponse {
     frames: string[];
     count: number;
+    offset: number;
+    total: number;
+    fps: number;
+    width: number | null;
+    height: number | null;
+    // Frame index rows: frame, timestamp, file, bytes, sharpness, brightness, fish, max_conf
+    columns: string[];
+    index: (number | string | null)[][];
+    // false while extraction is still running in the background, fetch again for more frames
+    complete: boolean;
+}
+
+// Segmentation mask of a crop, in frame coordinates (only with auto segmentation)
+export interface MaskRLE {
+    format: "rle";
+    origin: number[];
+    size: number[];
+    // COCO compressed string (older saved masks: list of run lengths)
+    counts: string | number[];
+}
+
+// Placement of the fish region on the square crop image
+export interface Letterbox {
+    origin: number[];
+    size: number;
+    scale: number;
+    offset: number[];
+    resized: number[];
 }
 
 export interface FishCrop {
@@ -18,8 +47,39 @@ export interface FishCrop {
     url: string;
     bbox: number[];
     confidence: number;
+    mask?: MaskRLE;
+    polygons?: number[][][];
+    letterbox?: Letterbox;
 }
 
+// Style that shows only the fish outline of a crop image (mask is applied on the client).
+// All polygons go into one SVG path, so fish split into several parts keep every part.
+export const maskStyle = (polygons?: number[][][], letterbox?: Letterbox): CSSProperties | undefined => {
+    if (!polygons || polygons.length === 0 || !letterbox) return undefined;
+    const [ox, oy] = letterbox.origin;
+    const [xo, yo] = letterbox.offset;
+    const d = polygons.filter(polygon => polygon.length >= 3).map(polygon => {
+        const points = polygon.map(([x, y]) => {
+            const px = (x - ox) * letterbox.scale + xo;
+            const py = (y - oy) * letterbox.scale + yo;
+            return `${px.toFixed(1)} ${py.toFixed(1)}`;
+        });
+        return `M${points.join(' L')} Z`;
+    }).join(' ');
+    if (!d) return undefined;
+    // Mask in crop image pixels, stretched over the element like the image itself
+    const svg = `<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 ${letterbox.size} ${letterbox.size}" preserveAspectRatio="none"><path fill-rule="evenodd" d="${d}"/></svg>`;
+    const image = `url("data:image/svg+xml,${encodeURIComponent(svg)}")`;
+    return {
+        maskImage: image,
+        WebkitMaskImage: image,
+        maskSize: '100% 100%',
+        WebkitMaskSize: '100% 100%',
+        maskRepeat: 'no-repeat',
+        WebkitMaskRepeat: 'no-repeat',
+    };
+};
+
 export interface ProcessResponse {
     fish: FishCrop[];
 }
@@ -30,8 +90,8 @@ export const fetchVideos = async (): Promise<VideoInfo[]> => {
     return res.json();
 };
 
-export const fetchFrames = async (videoPath: string): Promise<FrameResponse> => {
-    const res = await fetch(`${API_BASE}/frames?video_path=${encodeURIComponent(videoPath)}`);
+export const fetchFrames = async (videoPath: string, offset: number = 0): Promise<FrameResponse> => {
+    const res = await fetch(`${API_BASE}/frames?video_path=${encodeURIComponent(videoPath)}&offset=${offset}`);
     if (!res.ok) throw new Error("Failed to fetch frames");
     return res.json();
 };
@@ -57,6 +117,8 @@ export interface Annotation {
     url: string;
     label: string;
     filename: string;
+    polygons?: number[][][];
+    letterbox?: Letterbox;
 }
 
 export interface AnnotationResponse {
@@ -77,6 +139,9 @@ export const saveAnnotations = async (videoName: string, label: string, crops: F
     const payloadCrops = crops.map(c => ({
         url: c.url,
         bbox: c.bbox,
+        mask: c.mask,
+        polygons: c.polygons,
+        letterbox: c.letterbox,
         frame_index: frameIndex
     }));
 
@@ -155,3 +220,83 @@ export const fetchProgress = async (videoName: string): Promise<{ progress: numb
     if (!res.ok) throw new Error("Failed to fetch progress");
     return res.json();
 };
+
+export interface TranscriptionSearchResult extends TranscriptionSegment {
+    video_name: string;
+}
+
+export const searchTranscriptions = async (query: string, videoName?: string, limit: number = 50): Promise<{ results: TranscriptionSearchResult[] }> => {
+    const params = new URLSearchParams({ q: query, limit: String(limit) });
+    if (videoName) params.set('video_name', videoName);
+    const res = await fetch(`${API_BASE}/transcription/search?${params}`);
+    if (!res.ok) throw new Error("Failed to search transcriptions");
+    return res.json();
+};
+
+export const fetchTranscriptionAt = async (videoName: string, timestamp: number, padding: number = 0): Promise<{ segments: TranscriptionSegment[] }> => {
+    const params = new URLSearchParams({ video_name: videoName, timestamp: String(timestamp), padding: String(padding) });
+    const res = await fetch(`${API_BASE}/transcription/at?${params}`);
+    if (!res.ok) throw new Error("Failed to fetch transcription");
+    return res.json();
+};
+
+export interface LabelStats {
+    annotations: number;
+    frames: number;
+}
+
+export interface VideoStats {
+    video_name: string;
+    annotations: number;
+    annotated_frames: number;
+    total_frames: number | null; // null until frames are extracted
+    coverage: number | null;
+    labels: Record<string, LabelStats>;
+}
+
+export interface StatsResponse {
+    videos: VideoStats[];
+    labels: Record<string, number>;
+    annotations: number;
+    built_at: string | null;
+}
+
+// One range of the frame list in the coverage heatmap
+export interface CoverageBin {
+    start_frame: number;
+    end_frame: number;
+    start_time?: number;
+    end_time?: number;
+    frames: number;
+    annotated_frames: number;
+    annotations: number;
+    coverage: number;
+    labels: Record<string, number>;
+}
+
+export interface StatsTimelineResponse {
+    video_name: string;
+    total_frames: number;
+    annotated_frames: number;
+    labels: Record<string, number>;
+    bins: CoverageBin[];
+}
+
+export const fetchStats = async (): Promise<StatsResponse> => {
+    const res = await fetch(`${API_BASE}/stats`);
+    if (!res.ok) throw new Error("Failed to fetch stats");
+    return res.json();
+};
+
+export const fetchStatsTimeline = async (videoName: string, bins: number = 50): Promise<StatsTimelineResponse> => {
+    const params = new URLSearchParams({ video_name: videoName, bins: String(bins) });
+    const res = await fetch(`${API_BASE}/stats/timeline?${params}`);
+    if (!res.ok) throw new Error("Failed to fetch stats timeline");
+    return res.json();
+};
+
+export const rebuildStats = async (): Promise<{ videos: number; annotations: number; seconds: number }> => {
+    const res = await fetch(`${API_BASE}/stats/rebuild`, { method: 'POST' });
+    if (!res.ok) throw new Error("Failed to rebuild stats");
+    return res.json();
+};
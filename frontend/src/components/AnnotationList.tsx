@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import type { Annotation } from '../api';
-import { BASE_URL } from '../api';
+import { BASE_URL, maskStyle } from '../api';
 
 interface AnnotationListProps {
     annotations: Annotation[];
@@ -61,7 +61,7 @@ const AnnotationList: React.FC<AnnotationListProps> = ({ annotations, onSelect,
                                 handleMouseDown(ann.filename, selectedIds.has(ann.filename));
                             }}
                         >
-                            <img src={`${BASE_URL}${ann.url}`} className="w-full h-full object-contain" alt={ann.label} />
+                            <img src={`${BASE_URL}${ann.url}`} className="w-full h-full object-contain" alt={ann.label} style={maskStyle(ann.polygons, ann.letterbox)} />
 
                             <div className="absolute bottom-0 left-0 bg-black bg-opacity-70 text-xs px-1 w-full truncate text-white">
                                 {ann.label}
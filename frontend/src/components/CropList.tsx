@@ -1,6 +1,6 @@
 import React from 'react';
 import type { FishCrop } from '../api';
-import { BASE_URL } from '../api';
+import { BASE_URL, maskStyle } from '../api';
 
 interface CropListProps {
     crops: FishCrop[];
@@ -79,6 +79,7 @@ const CropList: React.FC<CropListProps> = ({ crops, loading, onSelect, selectedI
                                 src={`${BASE_URL}${crop.url}`}
                                 alt="Fish Crop"
                                 className="w-full h-full object-contain"
+                                style={maskStyle(crop.polygons, crop.letterbox)}
                             />
                         </div>
                     ))}
@@ -4,10 +4,27 @@
 source /home/ohnuma/anaconda3/etc/profile.d/conda.sh
 conda activate fish_annotation
 
+# Number of API worker processes (WORKERS=4 ./start_server.sh)
+WORKERS=${WORKERS:-1}
+
 # Start Backend
 echo "Starting Backend..."
 cd /home/ohnuma/Marine/20251202_AnnotationTool/backend
-uvicorn main:app --host 0.0.0.0 --port 8000 &
+if [ "$WORKERS" -gt 1 ]; then
+    # Models are loaded once in the model server, API workers call it over a local socket.
+    # The socket lives in a private (0700) directory and connections need a key generated per launch.
+    if [ -z "$MODEL_SERVER_ADDRESS" ]; then
+        MODEL_SERVER_DIR=$(mktemp -d -t fish_annotation.XXXXXX)
+        export MODEL_SERVER_ADDRESS=$MODEL_SERVER_DIR/models.sock
+    fi
+    export MODEL_SERVER_AUTHKEY=${MODEL_SERVER_AUTHKEY:-$(python -c "import secrets; print(secrets.token_hex(32))")}
+    echo "Starting Model Server at $MODEL_SERVER_ADDRESS..."
+    python model_server.py &
+    MODEL_SERVER_PID=$!
+    uvicorn main:app --host 0.0.0.0 --port 8000 --workers "$WORKERS" &
+else
+    uvicorn main:app --host 0.0.0.0 --port 8000 &
+fi
 BACKEND_PID=$!
 
 # Start Frontend
@@ -19,6 +36,13 @@ FRONTEND_PID=$!
 echo "Server started."
 echo "Backend PID: $BACKEND_PID"
 echo "Frontend PID: $FRONTEND_PID"
+if [ -n "$MODEL_SERVER_PID" ]; then
+    echo "Model Server PID: $MODEL_SERVER_PID"
+fi
 
 # Wait for processes
-wait $BACKEND_PID $FRONTEND_PID
+wait $BACKEND_PID $FRONTEND_PID $MODEL_SERVER_PID
+
+if [ -n "$MODEL_SERVER_DIR" ]; then
+    rm -rf "$MODEL_SERVER_DIR"
+fi